@@ -1,9 +1,13 @@
-from fastapi import FastAPI, UploadFile, HTTPException
+from fastapi import FastAPI, UploadFile, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 import os
+import sys
+import io
+import asyncio
 import shutil
 import subprocess
+import tempfile
 from pathlib import Path
 import pandas as pd
 import logging
@@ -11,6 +15,9 @@ import re
 import math
 import numpy as np
 import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from script import run_pipeline
 
 # Initialize FastAPI
 app = FastAPI()
@@ -33,6 +40,42 @@ Path(OUTPUT_FOLDER).mkdir(parents=True, exist_ok=True)
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
+# Worker processes for the CPU-bound analyses, created on first use
+_process_pool = None
+
+def process_pool():
+    """
+    Return the shared ProcessPoolExecutor, or None (the default thread pool) where the
+    platform can't start worker processes, e.g. serverless runtimes without /dev/shm.
+    """
+    global _process_pool
+    if _process_pool is None:
+        try:
+            # Spawn rather than fork: this process already runs the event loop and threadpool
+            # threads, and a forked child could inherit locks they hold (logging, imports)
+            _process_pool = ProcessPoolExecutor(max_workers=os.cpu_count(),
+                                                mp_context=multiprocessing.get_context("spawn"))
+        except (OSError, NotImplementedError) as e:
+            logging.warning(f"Process pool unavailable, analysing on threads: {e}")
+            _process_pool = False
+    return _process_pool or None
+
+# Buffer size for copying uploads to disk (the shutil default is 64 KiB)
+COPY_BUFSIZE = 1 << 20
+# Upper bound on uploads being written at once (open descriptors / disk queue depth)
+_UPLOAD_SEM = asyncio.Semaphore(32)
+
+# Last /process-folder result, keyed on the upload folder's signature
+_RESULT_CACHE: dict = {}
+
+def _folder_sig(folder):
+    """Names, sizes and mtimes of the files in folder; changes whenever the uploads do"""
+    entries = []
+    for f in Path(folder).iterdir():
+        st = f.stat()
+        entries.append((f.name, st.st_size, st.st_mtime_ns))
+    return tuple(sorted(entries))
+
 # Function to sanitize filenames (removes problematic characters)
 def sanitize_filename(filename):
     return re.sub(r'[^\w\-.]', '_', filename)
@@ -51,51 +94,170 @@ def clear_output_files():
             os.remove(fpath)
             logging.info(f"Deleted old {fname}")
 
+def write_excel_atomic(df, path):
+    """Write df to a temp workbook next to path, then swap it in so downloads never see a partial file"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".xlsx")
+    os.close(fd)
+    try:
+        df.to_excel(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def write_bytes_atomic(data, path):
+    """Write data to a temp file next to path, then swap it in"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+def copy_fd_range(src_fd, dst_fd, offset):
+    """
+    Copy src_fd from offset to EOF into dst_fd inside the kernel, with os.sendfile or
+    else os.copy_file_range. Returns False (leaving dst_fd untouched) if neither works.
+    """
+    for name in ("sendfile", "copy_file_range"):
+        copy = getattr(os, name, None)
+        if copy is None:
+            continue
+        pos = offset
+        try:
+            while True:
+                if name == "sendfile":
+                    sent = copy(dst_fd, src_fd, pos, 8 * COPY_BUFSIZE)
+                else:
+                    sent = copy(src_fd, dst_fd, 8 * COPY_BUFSIZE, pos)
+                if sent == 0:
+                    return True
+                pos += sent
+        except OSError:
+            # Not supported for these descriptors (e.g. macOS sendfile needs a socket);
+            # discard any partial output and try the next method
+            os.lseek(dst_fd, 0, os.SEEK_SET)
+            os.ftruncate(dst_fd, 0)
+    return False
+
+def save_upload(file: UploadFile, file_path: Path):
+    src = file.file
+    with file_path.open("wb") as buffer:
+        # Zero-copy path only once the spooled upload has rolled over to a real file;
+        # asking an in-memory spool for fileno() would force it onto disk first
+        if getattr(src, "_rolled", True):
+            try:
+                src_fd = src.fileno()
+            except (AttributeError, OSError, io.UnsupportedOperation):
+                src_fd = None
+            if src_fd is not None and copy_fd_range(src_fd, buffer.fileno(), src.tell()):
+                return
+        shutil.copyfileobj(src, buffer, length=COPY_BUFSIZE)
+
+async def save_upload_throttled(file: UploadFile, file_path: Path):
+    async with _UPLOAD_SEM:
+        await asyncio.to_thread(save_upload, file, file_path)
+
 @app.post("/upload-folder/")
 async def upload_folder(files: list[UploadFile]):
     """
     Clears the main UPLOAD_FOLDER, then uploads all files directly into it.
     """
-    clear_folder(UPLOAD_FOLDER)  # Clear previous uploads
-    clear_output_files()
+    # Clear previous uploads and outputs; rmtree on a large folder would otherwise stall the loop
+    await asyncio.to_thread(clear_folder, UPLOAD_FOLDER)
+    await asyncio.to_thread(clear_output_files)
     folder_path = Path(UPLOAD_FOLDER)
     uploaded_files = []
+    # Last upload wins when two names sanitize to the same path, as with sequential writes
+    targets = {}
     for file in files:
         sanitized_filename = sanitize_filename(file.filename)
         file_path = folder_path / sanitized_filename
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        targets[file_path] = file
         uploaded_files.append(str(file_path))
+    # Copy the files concurrently on worker threads so the event loop isn't blocked on disk I/O
+    await asyncio.gather(*[save_upload_throttled(file, file_path) for file_path, file in targets.items()])
     logging.info(f"Uploaded new files: {uploaded_files}")
     return {"message": "Files uploaded successfully.", "uploaded_files": uploaded_files}
 
 @app.post("/process-folder/")
-def process_folder():
+async def process_folder(background_tasks: BackgroundTasks):
     if not os.path.exists(UPLOAD_FOLDER) or not os.listdir(UPLOAD_FOLDER):
         logging.error("Uploads folder is empty or missing.")
         raise HTTPException(status_code=400, detail="No files found in uploads directory.")
-    logging.info(f"Processing files in {UPLOAD_FOLDER}")
     try:
         output_excel = os.path.join(OUTPUT_FOLDER, "output_metrics.xlsx")
         output_image = os.path.join(OUTPUT_FOLDER, "roi_overlay.png")
-        clear_output_files()
-        command = ["python", "script.py", UPLOAD_FOLDER, "--output", output_excel]
-        subprocess.run(command, check=True)
-        if not os.path.exists(output_excel):
-            logging.error("Processing script did not generate an output file.")
-            raise HTTPException(status_code=500, detail="Processing failed, no output file found.")
-        df = pd.read_excel(output_excel)
-        results = df.to_dict(orient="records")
-        image_exists = os.path.exists(output_image)
+        sig = await asyncio.to_thread(_folder_sig, UPLOAD_FOLDER)
+        if sig in _RESULT_CACHE:
+            logging.info(f"Uploads in {UPLOAD_FOLDER} unchanged, reusing previous results")
+            df, results, overlay = _RESULT_CACHE[sig]
+            # Other endpoints share these output paths and may have replaced or removed them
+            # since; restore this dataset's artifacts so the URLs below point at them. Drop any
+            # other workbook first so it can't be downloaded before the rewrite lands
+            await asyncio.to_thread(Path(output_excel).unlink, missing_ok=True)
+            background_tasks.add_task(write_excel_atomic, df, output_excel)
+            if overlay is not None:
+                await asyncio.to_thread(write_bytes_atomic, overlay, output_image)
+            image_exists = overlay is not None
+        else:
+            logging.info(f"Processing files in {UPLOAD_FOLDER}")
+            await asyncio.to_thread(clear_output_files)
+            # Call the imported pipeline directly (no interpreter start-up or re-imports), on a pooled
+            # worker process so concurrent requests use separate cores instead of sharing the GIL
+            df = await asyncio.get_running_loop().run_in_executor(process_pool(), run_pipeline, UPLOAD_FOLDER)
+            if df is None:
+                logging.error("Processing did not produce any metrics.")
+                raise HTTPException(status_code=500, detail="Processing failed, no output file found.")
+            # The workbook is only needed for the download; write it after the response is sent
+            background_tasks.add_task(write_excel_atomic, df, output_excel)
+            results = df.to_dict(orient="records")
+            image_exists = os.path.exists(output_image)
+            overlay = await asyncio.to_thread(Path(output_image).read_bytes) if image_exists else None
+            # Keep only the latest upload set; a new upload always changes the signature
+            _RESULT_CACHE.clear()
+            _RESULT_CACHE[sig] = (df, results, overlay)
         return {
             "message": "Processing completed.",
             "results": results,
             "image_url": "/roi-overlay" if image_exists else None,
             "excel_url": "/download-metrics"
         }
-    except subprocess.CalledProcessError as e:
-        logging.error(f"Error running script: {e}")
-        raise HTTPException(status_code=500, detail="Error processing folder.")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail="Unexpected server error.")
+
+@app.post("/upload-and-process/")
+async def upload_and_process(files: list[UploadFile], background_tasks: BackgroundTasks):
+    """
+    Analyses the uploaded files straight from the request's spooled streams, without
+    writing them to UPLOAD_FOLDER and reading them back.
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded.")
+    try:
+        output_excel = os.path.join(OUTPUT_FOLDER, "output_metrics.xlsx")
+        await asyncio.to_thread(clear_output_files)
+        streams = [(sanitize_filename(file.filename), file.file) for file in files]
+        # Open streams can't be sent to a worker process; analyse them on a thread
+        df = await asyncio.to_thread(run_pipeline, streams)
+        if df is None:
+            logging.error("Processing did not produce any metrics.")
+            raise HTTPException(status_code=500, detail="Processing failed, no output file found.")
+        background_tasks.add_task(write_excel_atomic, df, output_excel)
+        image_exists = os.path.exists(os.path.join(OUTPUT_FOLDER, "roi_overlay.png"))
+        return {
+            "message": "Processing completed.",
+            "results": df.to_dict(orient="records"),
+            "image_url": "/roi-overlay" if image_exists else None,
+            "excel_url": "/download-metrics"
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Unexpected error: {e}")
         raise HTTPException(status_code=500, detail="Unexpected server error.")
@@ -131,8 +293,8 @@ def process_nema_body():
         clear_output_files()
 
         # Include the --output parameter if your script expects it:
-        command = ["python", "nema_body.py", UPLOAD_FOLDER, "--output", output_excel]
-        result = subprocess.run(command, capture_output=True, text=True)
+        command = [sys.executable, "nema_body.py", UPLOAD_FOLDER, "--output", output_excel]
+        result = subprocess.run(command, capture_output=True, text=True, close_fds=False)
         logging.info("nema_body.py stdout: " + result.stdout)
         logging.error("nema_body.py stderr: " + result.stderr)
         if result.returncode != 0:
@@ -175,8 +337,8 @@ def process_torso():
         clear_output_files()
 
         # Include the --output parameter as expected by torso.py
-        command = ["python", "torso.py", UPLOAD_FOLDER, "--output", output_excel]
-        result = subprocess.run(command, capture_output=True, text=True)
+        command = [sys.executable, "torso.py", UPLOAD_FOLDER, "--output", output_excel]
+        result = subprocess.run(command, capture_output=True, text=True, close_fds=False)
         logging.info("torso.py stdout: " + result.stdout)
         logging.error("torso.py stderr: " + result.stderr)
         if result.returncode != 0:
@@ -186,9 +348,10 @@ def process_torso():
             logging.error("Torso processing did not generate an output file.")
             raise HTTPException(status_code=500, detail="Processing failed, no output file found.")
 
-        # Read both sheets from the Excel file
-        combined_df = pd.read_excel(output_excel, sheet_name="Combined Views")
-        elements_df = pd.read_excel(output_excel, sheet_name="Individual Elements")
+        # Read both sheets from a single open of the workbook
+        sheets = pd.read_excel(output_excel, sheet_name=["Combined Views", "Individual Elements"])
+        combined_df = sheets["Combined Views"]
+        elements_df = sheets["Individual Elements"]
         
         # Convert to dictionaries
         combined_results = combined_df.to_dict(orient="records")
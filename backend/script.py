@@ -5,7 +5,8 @@ import pandas as pd
 import argparse
 import logging
 from skimage import measure, filters, morphology
-from matplotlib import pyplot as plt
+import tempfile
+from matplotlib.figure import Figure
 from matplotlib.patches import Circle
 
 def configure_logging():
@@ -16,16 +17,22 @@ def configure_logging():
         format='%(asctime)s:%(levelname)s:%(message)s'
     )
 
+def read_dicom(source, **kwargs):
+    """dcmread a path or a binary stream; streams are rewound so they can be read repeatedly."""
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return pydicom.dcmread(source, **kwargs)
+
 def is_dicom_file(file_path):
     try:
-        ds = pydicom.dcmread(file_path, stop_before_pixels=True, force=True)
+        ds = read_dicom(file_path, stop_before_pixels=True, force=True)
         return True
     except Exception:
         return False
 
 def load_dicom_image(file_path):
     try:
-        ds = pydicom.dcmread(file_path)
+        ds = read_dicom(file_path)
         image = ds.pixel_array.astype(np.float32)
         if 'RescaleSlope' in ds and 'RescaleIntercept' in ds:
             image = image * ds.RescaleSlope + ds.RescaleIntercept
@@ -35,18 +42,19 @@ def load_dicom_image(file_path):
         raise e
 
 def find_best_slice(dicom_files):
+    """Pick the best slice from (name, path or stream) pairs and return its pair."""
     slices = []
-    for file_path in dicom_files:
-        ds = pydicom.dcmread(file_path, stop_before_pixels=True)
+    for name, file_path in dicom_files:
+        ds = read_dicom(file_path, stop_before_pixels=True)
         slice_location = getattr(ds, 'SliceLocation', None)
         instance_number = getattr(ds, 'InstanceNumber', None)
         image, _ = load_dicom_image(file_path)
         mean_intensity = np.mean(image)
-        slices.append((file_path, slice_location, instance_number, mean_intensity))
+        slices.append(((name, file_path), slice_location, instance_number, mean_intensity))
     
     slices.sort(key=lambda x: (abs(x[1]) if x[1] is not None else float('inf'), -x[3]))
     best_slice = slices[0]
-    print(f"Selected slice: {os.path.basename(best_slice[0])} (Slice Location: {best_slice[1]}, Instance Number: {best_slice[2]}, Mean Intensity: {best_slice[3]:.2f})")
+    print(f"Selected slice: {os.path.basename(best_slice[0][0])} (Slice Location: {best_slice[1]}, Instance Number: {best_slice[2]}, Mean Intensity: {best_slice[3]:.2f})")
     return best_slice[0]
 
 def detect_circular_object(image):
@@ -97,22 +105,30 @@ def create_circular_roi(image, pixel_spacing, desired_area_mm2=338 * 100):
 
 def visualize_roi(image, center_x, center_y, radius_pixels):
     """
-    Display and save the image with ROI overlay.
+    Save the image with ROI overlay.
     """
-    fig, ax = plt.subplots(figsize=(6, 6))
+    # A standalone Figure instead of pyplot: the pipeline runs on API worker threads, where
+    # pyplot's shared current figure would mix concurrent requests and a GUI backend fails
+    fig = Figure(figsize=(6, 6))
+    ax = fig.subplots()
     ax.imshow(image, cmap='gray')
     circle = Circle((center_x, center_y), radius_pixels, color='red', fill=False, linewidth=2)
     ax.add_patch(circle)
     ax.set_title(f'ROI Overlay (Center: {center_x}, {center_y}, Radius: {radius_pixels} px)')
-    plt.axis('off')
+    ax.axis('off')
     
-    # Save visualization
+    # Save visualization; write beside the target and swap it in so readers never see a partial file
     save_path = "outputs/roi_overlay.png"
-    plt.savefig(save_path, bbox_inches='tight', dpi=300)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(save_path), suffix=".png")
+    os.close(fd)
+    try:
+        fig.savefig(tmp_path, bbox_inches='tight', dpi=300)
+        os.replace(tmp_path, save_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
     print(f"ROI visualization saved as: {save_path}")
 
-    plt.show()
-
 def compute_metrics(image, ROI_mask):
     signal_values = image[ROI_mask == 1]
     if signal_values.size == 0:
@@ -131,14 +147,23 @@ def compute_metrics(image, ROI_mask):
     
     return metrics
 
-def process_directory(directory_path, output_excel='output_metrics.xlsx'):
+def run_pipeline(source):
+    """
+    Analyse the best slice and return the metrics as a DataFrame, or None if no metrics
+    could be extracted. source is a directory path or an iterable of (name, binary stream)
+    pairs, so uploads can be analysed without being written to disk first.
+    """
     results = []
-    dicom_files = [os.path.join(directory_path, f) for f in os.listdir(directory_path) if is_dicom_file(os.path.join(directory_path, f))]
+    if isinstance(source, (str, os.PathLike)):
+        candidates = [(os.path.join(source, f), os.path.join(source, f)) for f in os.listdir(source)]
+    else:
+        candidates = list(source)
+    dicom_files = [(name, file) for name, file in candidates if is_dicom_file(file)]
     if not dicom_files:
         logging.warning("No DICOM files found in the directory.")
         return
     
-    best_slice = find_best_slice(dicom_files)
+    best_name, best_slice = find_best_slice(dicom_files)
     try:
         image, ds = load_dicom_image(best_slice)
         pixel_spacing = [float(x) for x in ds.PixelSpacing[:2]]
@@ -146,17 +171,22 @@ def process_directory(directory_path, output_excel='output_metrics.xlsx'):
         metrics = compute_metrics(image, ROI_mask)
         
         if metrics:
-            results.append({"Filename": os.path.basename(best_slice), **metrics})
-            logging.info(f"Processed {best_slice} successfully.")
+            results.append({"Filename": os.path.basename(best_name), **metrics})
+            logging.info(f"Processed {best_name} successfully.")
     except Exception as e:
-        logging.error(f"Error processing {best_slice}: {e}", exc_info=True)
+        logging.error(f"Error processing {best_name}: {e}", exc_info=True)
     
     if not results:
         logging.warning("No metrics were extracted. Ensure that the DICOM files are valid.")
         return
     
     # Convert to Pandas DataFrame and round all values to 2 decimal places
-    df = pd.DataFrame(results).round(2)
+    return pd.DataFrame(results).round(2)
+
+def process_directory(directory_path, output_excel='output_metrics.xlsx'):
+    df = run_pipeline(directory_path)
+    if df is None:
+        return
     df.to_excel(output_excel, index=False)
     print(f"Metrics saved to {output_excel}")
 
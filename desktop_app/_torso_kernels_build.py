@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Ahead-of-time build of the torso numeric kernels.
+Compiles torso_kernels (a plain C extension) next to this file so the
+desktop app does not pay numba's JIT compile on first use. torso.py falls
+back to @njit or NumPy when the extension is missing.
+"""
+
+import os
+from numba.pycc import CC
+
+import torso
+
+cc = CC("torso_kernels")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+cc.export("circle_mask", "b1[:,:](i8, i8, i8, i8, f8)")(torso._circle_mask_kernel)
+cc.export("roi_stats", "f8[:](f8[:,:], b1[:,:])")(torso._roi_stats_kernel)
+
+if __name__ == "__main__":
+    cc.compile()
+    print(f"Built torso_kernels in {cc.output_dir}")
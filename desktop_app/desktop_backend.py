@@ -1,5 +1,6 @@
 # ...
 import os
+import asyncio
 import shutil
 import threading
 import time
@@ -7,19 +8,22 @@ import logging
 import socket
 import re
 import sys
+import uuid
 from pathlib import Path
-from fastapi import FastAPI, UploadFile, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, HTTPException, Body
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+import aiofiles
+import orjson
 import pandas as pd
 import numpy as np
-import math
 import json
 
 class DesktopBackend:
     def __init__(self):
-        self.app = FastAPI()
+        self.app = FastAPI(default_response_class=ORJSONResponse)
         self.setup_middleware()
         self.setup_routes()
         self.setup_directories()
@@ -27,6 +31,7 @@ class DesktopBackend:
         self.server = None
         self.actual_port = None
         self.script_dir = self.get_script_directory()
+        self._reaper = None
 
     def setup_middleware(self):
         self.app.add_middleware(
@@ -39,6 +44,13 @@ class DesktopBackend:
 
     def setup_directories(self):
         self.UPLOAD_FOLDER = "uploads"
+        self.UPLOAD_CHUNK_SIZE = 1 << 20
+        self.SESSION_TTL = 30 * 60
+        self.SESSION_REAP_INTERVAL = 60
+        self.latest_session = None
+        # session_id -> {relative path: sha256} of files already stored in that session
+        self.session_manifests = {}
+        self.pending_digests = {}
         self.OUTPUT_FOLDER = "outputs"
         Path(self.UPLOAD_FOLDER).mkdir(parents=True, exist_ok=True)
         Path(self.OUTPUT_FOLDER).mkdir(parents=True, exist_ok=True)
@@ -66,13 +78,70 @@ class DesktopBackend:
     def sanitize_filename(self, filename):
         return re.sub(r'[^\w\-.]', '_', filename)
 
-    def clear_folder(self, folder_path):
-        if os.path.exists(folder_path):
-            shutil.rmtree(folder_path)
-        os.makedirs(folder_path, exist_ok=True)
+    def create_session(self):
+        session_id = uuid.uuid4().hex
+        (Path(self.UPLOAD_FOLDER) / session_id).mkdir(parents=True)
+        return session_id
 
-    def clear_output_files(self):
-        output_files = [
+    def fork_session(self, base_id, manifest):
+        """
+        Start a new session holding hardlinks to the files of base_id that are unchanged in
+        manifest, and return it with the paths still to upload. The base session is never
+        modified, so a job still reading it is unaffected.
+        """
+        session_id = self.create_session()
+        session_dir = Path(self.UPLOAD_FOLDER) / session_id
+        base_known = self.session_manifests.get(base_id, {}) if self.is_session(base_id) else {}
+        known = {}
+        for relative_path, digest in manifest.items():
+            if base_known.get(relative_path) != digest:
+                continue
+            target = session_dir / relative_path
+            try:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.link(Path(self.UPLOAD_FOLDER) / base_id / relative_path, target)
+                known[relative_path] = digest
+            except OSError:
+                pass  # Missing or on a filesystem without hardlinks; the client re-sends it
+        needed = [relative_path for relative_path in manifest if relative_path not in known]
+        self.session_manifests[session_id] = known
+        self.pending_digests[session_id] = {p: manifest[p] for p in needed}
+        self.latest_session = session_id
+        return session_id, needed
+
+    def is_session(self, session_id):
+        return (bool(session_id) and re.fullmatch(r"[0-9a-f]{32}", session_id) is not None
+                and os.path.isdir(os.path.join(self.UPLOAD_FOLDER, session_id)))
+
+    def get_session_dir(self, session_id=None):
+        session_id = session_id or self.latest_session
+        if not session_id or not re.fullmatch(r"[0-9a-f]{32}", session_id):
+            raise HTTPException(status_code=400, detail="No files found in uploads directory.")
+        session_dir = os.path.join(self.UPLOAD_FOLDER, session_id)
+        if not os.path.isdir(session_dir) or not os.listdir(session_dir):
+            raise HTTPException(status_code=400, detail="No files found in uploads directory.")
+        return session_dir
+
+    def reap_sessions(self):
+        # Upload sessions are never reused once a newer one exists; drop stale ones in the background
+        while True:
+            time.sleep(self.SESSION_REAP_INTERVAL)
+            cutoff = time.time() - self.SESSION_TTL
+            try:
+                with os.scandir(self.UPLOAD_FOLDER) as entries:
+                    for entry in entries:
+                        if (entry.is_dir(follow_symlinks=False)
+                                and entry.name != self.latest_session
+                                and entry.stat().st_mtime < cutoff):
+                            shutil.rmtree(entry.path, ignore_errors=True)
+                            self.session_manifests.pop(entry.name, None)
+                            self.pending_digests.pop(entry.name, None)
+                            logging.info(f"Removed expired upload session {entry.name}")
+            except OSError as e:
+                logging.error(f"Error reaping upload sessions: {e}")
+
+    def clear_output_files(self, *output_files):
+        output_files = output_files or [
             "output_metrics.xlsx",
             "nema_body_metrics.xlsx",
             "torso_coil_analysis.xlsx",
@@ -84,47 +153,68 @@ class DesktopBackend:
             if os.path.exists(file_path):
                 os.remove(file_path)
 
-    def fix_floats(self, data):
-        if isinstance(data, dict):
-            return {k: self.fix_floats(v) for k, v in data.items()}
-        elif isinstance(data, list):
-            return [self.fix_floats(item) for item in data]
-        elif isinstance(data, float):
-            if math.isnan(data) or math.isinf(data):
-                return 0.0
-            return data
-        return data
+    def to_records(self, df):
+        # NaN/inf are not valid JSON; zero them in one vectorized pass
+        df = df.replace([np.inf, -np.inf], np.nan).fillna(0.0)
+        return df.to_dict(orient="records")
 
     def setup_routes(self):
+        # Process endpoints are plain `def` so FastAPI runs them in its threadpool
+        # and concurrent jobs (e.g. the GUI's Process All) don't serialize on the event loop
         @self.app.get("/")
         async def root():
             return {"message": "MRI DICOM Analysis Backend"}
 
+        @self.app.post("/upload-folder/negotiate")
+        async def negotiate_upload(payload: dict = Body(...)):
+            # Client sends {relative path: sha256}; only files the previous session lacks are requested
+            session_id, needed = await asyncio.to_thread(
+                self.fork_session, payload.get("session_id"), payload.get("manifest", {}))
+            total = len(payload.get("manifest", {}))
+            logging.info(f"Upload negotiation for session {session_id}: {len(needed)}/{total} files needed")
+            return {"session_id": session_id, "needed": needed}
+
         @self.app.post("/upload-folder/")
-        async def upload_folder(files: list[UploadFile]):
-            self.clear_folder(self.UPLOAD_FOLDER)
-            self.clear_output_files()
-            uploaded_files = []
-            for file in files:
-                file_path = Path(self.UPLOAD_FOLDER) / file.filename
+        async def upload_folder(files: list[UploadFile], session_id: str | None = None):
+            # Without a session_id this is a one-shot upload; with one, files are
+            # appended so a client can send a folder as several concurrent shards
+            if session_id is None:
+                session_id = self.create_session()
+            elif not self.is_session(session_id):
+                raise HTTPException(status_code=404, detail="Upload session not found.")
+            session_dir = Path(self.UPLOAD_FOLDER) / session_id
+            pending = self.pending_digests.get(session_id, {})
+            known = self.session_manifests.setdefault(session_id, {})
+
+            async def save_one(file: UploadFile):
+                file_path = session_dir / file.filename
                 file_path.parent.mkdir(parents=True, exist_ok=True)
-                with file_path.open("wb") as buffer:
-                    shutil.copyfileobj(file.file, buffer)
-                uploaded_files.append(str(file_path))
-            logging.info(f"Uploaded {len(uploaded_files)} files with folder structure preserved")
-            return {"message": "Files uploaded successfully.", "uploaded_files": uploaded_files}
+                async with aiofiles.open(file_path, "wb") as out:
+                    while chunk := await file.read(self.UPLOAD_CHUNK_SIZE):
+                        await out.write(chunk)
+                if file.filename in pending:
+                    known[file.filename] = pending.pop(file.filename)
+                return str(file_path)
+
+            uploaded_files = await asyncio.gather(*[save_one(f) for f in files])
+            self.latest_session = session_id
+            logging.info(f"Uploaded {len(uploaded_files)} files with folder structure preserved to session {session_id}")
+            return {
+                "message": "Files uploaded successfully.",
+                "session_id": session_id,
+                "uploaded_files": uploaded_files
+            }
 
         @self.app.post("/process-folder/")
-        async def process_folder():
-            if not os.path.exists(self.UPLOAD_FOLDER) or not os.listdir(self.UPLOAD_FOLDER):
-                raise HTTPException(status_code=400, detail="No files found in uploads directory.")
+        def process_folder(session_id: str | None = None):
+            upload_dir = self.get_session_dir(session_id)
             try:
                 output_excel = os.path.join(self.OUTPUT_FOLDER, "output_metrics.xlsx")
-                self.clear_output_files()
+                self.clear_output_files("output_metrics.xlsx")
                 
                 # Import and call function directly instead of using subprocess
                 import script
-                script.process_directory(self.UPLOAD_FOLDER, output_excel)
+                script.process_directory(upload_dir, output_excel)
                 
                 if not os.path.exists(output_excel):
                     raise HTTPException(status_code=500, detail="Processing failed, no output file found.")
@@ -140,16 +230,15 @@ class DesktopBackend:
                 raise HTTPException(status_code=500, detail="Unexpected server error.")
 
         @self.app.post("/process-nema-body/")
-        async def process_nema_body():
-            if not os.path.exists(self.UPLOAD_FOLDER) or not os.listdir(self.UPLOAD_FOLDER):
-                raise HTTPException(status_code=400, detail="No files found in uploads directory.")
+        def process_nema_body(session_id: str | None = None):
+            upload_dir = self.get_session_dir(session_id)
             try:
                 output_excel = os.path.join(self.OUTPUT_FOLDER, "nema_body_metrics.xlsx")
-                self.clear_output_files()
+                self.clear_output_files("nema_body_metrics.xlsx")
                 
                 # Import and call function directly instead of using subprocess
                 import nema_body
-                results = nema_body.process_directory(self.UPLOAD_FOLDER, visualize=False)
+                results = nema_body.process_directory(upload_dir, visualize=False)
                 
                 if not results:
                     raise HTTPException(status_code=500, detail="Processing failed, no results found.")
@@ -158,11 +247,13 @@ class DesktopBackend:
                 df = pd.DataFrame(results)
                 df.to_excel(output_excel, index=False)
                 
-                grouped = df.groupby("Orientation").apply(lambda x: x.to_dict(orient="records")).to_dict()
-                grouped_fixed = self.fix_floats(grouped)
+                grouped = {
+                    orientation: self.to_records(group)
+                    for orientation, group in df.groupby("Orientation")
+                }
                 return {
                     "message": "NEMA body processing completed.",
-                    "results": grouped_fixed,
+                    "results": grouped,
                     "excel_url": "/download-nema-body"
                 }
             except Exception as e:
@@ -170,16 +261,15 @@ class DesktopBackend:
                 raise HTTPException(status_code=500, detail="Unexpected server error.")
 
         @self.app.post("/process-torso/")
-        async def process_torso():
-            if not os.path.exists(self.UPLOAD_FOLDER) or not os.listdir(self.UPLOAD_FOLDER):
-                raise HTTPException(status_code=400, detail="No files found in uploads directory.")
+        def process_torso(session_id: str | None = None):
+            upload_dir = self.get_session_dir(session_id)
             try:
                 output_excel = os.path.join(self.OUTPUT_FOLDER, "torso_coil_analysis.xlsx")
-                self.clear_output_files()
+                self.clear_output_files("torso_coil_analysis.xlsx")
                 
                 # Import and call function directly instead of using subprocess
                 import torso
-                combined, elements = torso.process_torso_folder(self.UPLOAD_FOLDER)
+                combined, elements = torso.process_torso_folder(upload_dir)
                 
                 # Create DataFrames and save to Excel
                 df_combined = pd.DataFrame(combined)
@@ -189,12 +279,10 @@ class DesktopBackend:
                     df_combined.to_excel(writer, index=False, sheet_name="Combined Views")
                     df_elements.to_excel(writer, index=False, sheet_name="Individual Elements")
                 
-                combined_fixed = self.fix_floats(combined)
-                elements_fixed = self.fix_floats(elements)
                 return {
                     "message": "Torso processing completed.",
-                    "combined_results": combined_fixed,
-                    "element_results": elements_fixed,
+                    "combined_results": self.to_records(df_combined),
+                    "element_results": self.to_records(df_elements),
                     "excel_url": "/download-torso"
                 }
             except Exception as e:
@@ -202,16 +290,15 @@ class DesktopBackend:
                 raise HTTPException(status_code=500, detail="Unexpected server error.")
 
         @self.app.post("/process-head-neck/")
-        async def process_head_neck():
-            if not os.path.exists(self.UPLOAD_FOLDER) or not os.listdir(self.UPLOAD_FOLDER):
-                raise HTTPException(status_code=400, detail="No files found in uploads directory.")
+        def process_head_neck(session_id: str | None = None):
+            upload_dir = self.get_session_dir(session_id)
             try:
                 output_excel = os.path.join(self.OUTPUT_FOLDER, "headneck_analysis.xlsx")
-                self.clear_output_files()
+                self.clear_output_files("headneck_analysis.xlsx")
                 
                 # Import and call function directly instead of using subprocess
                 import head_neck
-                combined, elements = head_neck.process_hn_folder(self.UPLOAD_FOLDER)
+                combined, elements = head_neck.process_hn_folder(upload_dir)
                 
                 # Create DataFrames and save to Excel
                 df_combined = pd.DataFrame(combined)
@@ -221,18 +308,51 @@ class DesktopBackend:
                     df_combined.to_excel(writer, index=False, sheet_name="Combined Views")
                     df_elements.to_excel(writer, index=False, sheet_name="Individual Elements")
                 
-                combined_fixed = self.fix_floats(combined)
-                elements_fixed = self.fix_floats(elements)
                 return {
                     "message": "Head & Neck processing completed.",
-                    "combined_results": combined_fixed,
-                    "element_results": elements_fixed,
+                    "combined_results": self.to_records(df_combined),
+                    "element_results": self.to_records(df_elements),
                     "excel_url": "/download-head-neck"
                 }
             except Exception as e:
                 logging.error(f"Error in process_head_neck: {e}")
                 raise HTTPException(status_code=500, detail="Unexpected server error.")
 
+        stream_jobs = {
+            "weekly": process_folder,
+            "nema": process_nema_body,
+            "torso": process_torso,
+            "headneck": process_head_neck,
+        }
+
+        @self.app.post("/process-stream/")
+        async def process_stream(session_id: str | None = None, jobs: str = ",".join(stream_jobs)):
+            # Run the requested analyses concurrently and send each result as a server-sent
+            # event as soon as it finishes. The analyses pair signal/noise series across the
+            # whole folder, so they start once the upload is complete.
+            self.get_session_dir(session_id)
+            selected = [job for job in jobs.split(",") if job]
+            unknown = [job for job in selected if job not in stream_jobs]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown jobs: {', '.join(unknown)}")
+
+            async def events():
+                pending = {
+                    asyncio.ensure_future(run_in_threadpool(stream_jobs[job], session_id)): job
+                    for job in selected
+                }
+                while pending:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        job = pending.pop(task)
+                        try:
+                            event = {"job": job, "result": task.result()}
+                        except HTTPException as e:
+                            event = {"job": job, "error": e.detail}
+                        yield b"data: " + orjson.dumps(event, option=orjson.OPT_SERIALIZE_NUMPY) + b"\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
         @self.app.get("/download-metrics")
         async def download_metrics():
             excel_path = os.path.join(self.OUTPUT_FOLDER, "output_metrics.xlsx")
@@ -293,6 +413,11 @@ class DesktopBackend:
 
         server_thread = threading.Thread(target=run_server, daemon=True)
         server_thread.start()
+        # Only the process serving uploads reaps sessions; a process that merely imports this
+        # module (e.g. a spawned worker) doesn't know the live session and must not delete it
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self.reap_sessions, daemon=True)
+            self._reaper.start()
         return server_thread, self.actual_port
 
 # Create the backend instance
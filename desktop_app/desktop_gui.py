@@ -1,19 +1,144 @@
 import flet as ft
+import asyncio
 import threading
+import httpx
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 import json
-import pandas as pd
+import contextlib
+import functools
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import time
 import subprocess
 
+def iter_files(root):
+    """Yield (DirEntry, relative path) for every regular file under root, skipping symlinks."""
+    stack = [(root, "")]
+    while stack:
+        path, prefix = stack.pop()
+        with os.scandir(path) as it:
+            for entry in it:
+                relative_path = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, relative_path + os.sep))
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry, relative_path
+
+def sha256_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Extensions a preamble-less (raw) DICOM data set is commonly stored under
+RAW_DICOM_SUFFIXES = {"", ".dcm", ".dicom", ".ima"}
+
+def _is_dicom_preamble(path):
+    """Cheap 132-byte check for the 'DICM' magic at offset 128."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(132)[128:] == b'DICM'
+    except OSError:
+        return False
+
+def is_upload_candidate(entry):
+    # Files with the DICM magic always go up. The weekly analysis also reads raw data sets
+    # without a preamble, so keep extensionless/.dcm files too; skip hidden files and anything
+    # else (JPEGs, logs, spreadsheets) that no analysis can use.
+    if entry.name.startswith('.'):
+        return False
+    if _is_dicom_preamble(entry.path):
+        return True
+    suffix = os.path.splitext(entry.name)[1].lower()
+    # A name ending in a UID component ("1.2.840.113619.2.5") is effectively extensionless
+    return suffix in RAW_DICOM_SUFFIXES or suffix[1:].isdigit()
+
+class LazyFile:
+    """Read-only file body that is opened on first read and closed at EOF.
+
+    MultipartEncoder sizes each part up front from `len` (bytes remaining) and
+    pulls bodies lazily, so at most one upload file is open at a time.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.len = os.path.getsize(path)
+        self._fh = None
+
+    def read(self, size=-1):
+        if self.len <= 0:
+            return b""
+        if self._fh is None:
+            self._fh = open(self.path, 'rb')
+        chunk = self._fh.read(size)
+        self.len = self.len - len(chunk) if chunk else 0
+        if self.len <= 0:
+            self.close()
+        return chunk
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 class MRIAnalysisApp:
+    HASH_WORKERS = 8
+    # Files go up in fixed-size batches with a bounded number of requests in flight
+    UPLOAD_BATCH_SIZE = 20
+    UPLOAD_WORKERS = 4
+    # kind -> (process endpoint, results attribute, response key or None for the whole body, empty result)
+    _JOBS = {
+        "weekly": ("/process-folder/", "weekly_results", "results", list),
+        "nema": ("/process-nema-body/", "nema_results", "results", dict),
+        "torso": ("/process-torso/", "torso_results", None,
+                  lambda: {'combined_results': [], 'element_results': []}),
+        "headneck": ("/process-head-neck/", "headneck_results", None,
+                     lambda: {'combined_results': [], 'element_results': []}),
+    }
+    # kind -> (backend endpoint, file name in ~/Downloads, label)
+    _DOWNLOADS = {
+        "weekly": ("/download-metrics", "weekly_metrics.xlsx", "Weekly"),
+        "nema": ("/download-nema-body", "nema_body_metrics.xlsx", "NEMA body"),
+        "torso": ("/download-torso", "torso_coil_analysis.xlsx", "Torso"),
+        "headneck": ("/download-head-neck", "headneck_analysis.xlsx", "Head & Neck"),
+    }
+    VIRTUAL_TABLE_THRESHOLD = 200
+    VIRTUAL_PAGE_SIZE = 100
+    VIRTUAL_CELL_WIDTH = 140
+    
     def __init__(self, backend):
         self.backend = backend
         self.backend_url = "http://127.0.0.1:8000"
+        
+        # One pooled keep-alive session for every backend call
+        self.http = requests.Session()
+        self.http.headers["Connection"] = "keep-alive"
+        self.http.mount("http://", HTTPAdapter(
+            pool_connections=20, pool_maxsize=20,
+            max_retries=Retry(total=3, backoff_factor=0.2)
+        ))
         self.server_running = False
         self.selected_folder = None
+        self.session_id = None
+        self._output_folder_path: str | None = None
+        self._uploaded_fingerprint: str | None = None
+        # (path, size, mtime_ns) -> sha256, so unchanged files aren't re-hashed between uploads
+        self._digest_cache: dict[tuple, str] = {}
+        # (job kind, title) -> (result data, built table)
+        self._table_cache: dict[tuple, tuple] = {}
+        self._downloads_dir = Path.home() / "Downloads"
         
         # Results storage
         self.weekly_results = []
@@ -23,38 +148,55 @@ class MRIAnalysisApp:
         
         # UI components
         self.page = None
+        self.client = None
         self.folder_text = None
         self.weekly_btn = None
         self.nema_btn = None
         self.torso_btn = None
         self.head_neck_btn = None
+        self.process_all_btn = None
         self.results_container = None
         
         # Start backend server
         self.start_backend()
     
     def start_backend(self):
+        self._backend_ready = threading.Event()
+        # A (re)started backend may report a different output folder
+        self._output_folder_path = None
+        
         def run_backend():
             try:
                 server_thread, actual_port = self.backend.start_server()
                 self.backend_url = f"http://127.0.0.1:{actual_port}"
-                time.sleep(2)
+                self._wait_for_backend()
                 self.server_running = True
                 print(f"Backend server started on port {actual_port}")
             except Exception as e:
                 print(f"Failed to start backend: {e}")
                 self.server_running = False
+            finally:
+                self._backend_ready.set()
         
         backend_thread = threading.Thread(target=run_backend, daemon=True)
         backend_thread.start()
-        
-        for _ in range(10):
+        self._backend_ready.wait(timeout=10)
+    
+    def _wait_for_backend(self, deadline=10.0):
+        # Probe with exponential backoff. A bare requests.get has no retries, unlike self.http,
+        # whose urllib3 retries would spend over a second on each refused connection
+        delay = 0.1
+        give_up = time.monotonic() + deadline
+        while True:
             try:
-                response = requests.get(f"{self.backend_url}/", timeout=1)
-                self.server_running = True
-                break
-            except Exception:
-                time.sleep(1)
+                if requests.get(f"{self.backend_url}/", timeout=1).ok:
+                    return
+            except requests.RequestException:
+                pass
+            if time.monotonic() + delay > give_up:
+                raise RuntimeError(f"Backend did not respond within {deadline:.0f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
     
     def pick_folder(self, e):
         def _open_dialog():
@@ -67,6 +209,8 @@ class MRIAnalysisApp:
                 if result.returncode == 0:
                     folder = result.stdout.strip().rstrip("/")
                     if folder:
+                        if folder != self.selected_folder:
+                            self._digest_cache.clear()
                         self.selected_folder = folder
                         self.folder_text.value = folder
                         if self.page:
@@ -75,212 +219,262 @@ class MRIAnalysisApp:
                 print(f"Folder picker error: {ex}")
         threading.Thread(target=_open_dialog, daemon=True).start()
     
-    def clear_previous_results(self):
-        self.weekly_results = None
-        self.nema_results = None
-        self.torso_results = None
-        self.headneck_results = None
-        if self.results_container:
-            self.results_container.controls.clear()
-            if self.page:
-                self.page.update()
+    def clear_previous_results(self, *kinds):
+        # Only the given jobs (all by default), so results another running job has just
+        # stored stay on screen; runs on the page loop since it updates the page
+        kinds = kinds or tuple(self._JOBS)
+        for kind in kinds:
+            setattr(self, self._JOBS[kind][1], None)
+        for key in [key for key in self._table_cache if key[0] in kinds]:
+            del self._table_cache[key]
+        self.update_results_display()
+    
+    def _build_manifest(self, folder_path, entries=None):
+        """Return {relative path: sha256} for every file under folder_path."""
+        if entries is None:
+            entries = list(iter_files(folder_path))
+        keys = [(entry.path, entry.stat().st_size, entry.stat().st_mtime_ns) for entry, _ in entries]
+        stale = [key[0] for key in keys if key not in self._digest_cache]
+        with ThreadPoolExecutor(max_workers=self.HASH_WORKERS) as executor:
+            fresh = dict(zip(stale, executor.map(sha256_file, stale)))
+        # Rebuilt every time and pruned to the current files, so renames and replaced files
+        # always show up in the manifest
+        self._digest_cache = {key: self._digest_cache.get(key) or fresh[key[0]] for key in keys}
+        return {relative_path: self._digest_cache[key] for (_, relative_path), key in zip(entries, keys)}
     
     def upload_files(self, folder_path):
-        self.clear_previous_results()
-        files = []
-        for root, _, filenames in os.walk(folder_path):
-            for filename in filenames:
-                file_path = os.path.join(root, filename)
-                relative_path = os.path.relpath(file_path, folder_path)
-                files.append(('files', (relative_path, open(file_path, 'rb'))))
-        response = requests.post(f"{self.backend_url}/upload-folder/", files=files)
-        for _, (_, file_obj) in files:
-            file_obj.close()
+        entries = list(iter_files(folder_path))
+        # Unchanged folder since the last successful upload: the session already holds it,
+        # so skip hashing and negotiation altogether
+        fingerprint = hashlib.sha256(json.dumps(sorted(
+            (relative_path, entry.stat().st_mtime_ns, entry.stat().st_size) for entry, relative_path in entries
+        ) + [folder_path]).encode()).hexdigest()
+        if self.session_id and fingerprint == self._uploaded_fingerprint:
+            return {"message": "Files already uploaded.", "session_id": self.session_id, "uploaded_files": []}
+        with ThreadPoolExecutor(max_workers=self.HASH_WORKERS) as executor:
+            keep = list(executor.map(is_upload_candidate, [entry for entry, _ in entries]))
+        entries = [item for item, ok in zip(entries, keep) if ok]
+        manifest = self._build_manifest(folder_path, entries)
+        
+        # Only send the files the backend does not already hold for this session
+        response = self.http.post(f"{self.backend_url}/upload-folder/negotiate",
+                                  json={"session_id": self.session_id, "manifest": manifest}, timeout=30)
+        response.raise_for_status()
+        negotiated = response.json()
+        session_id = negotiated["session_id"]
+        files = [(os.path.join(folder_path, rel), rel) for rel in negotiated["needed"]]
+        
+        # Batches go up concurrently over the pooled session; requests releases the GIL on socket I/O,
+        # and the backend appends each batch to the same session directory
+        batches = [files[i:i + self.UPLOAD_BATCH_SIZE] for i in range(0, len(files), self.UPLOAD_BATCH_SIZE)]
+        uploaded_files = []
+        with ThreadPoolExecutor(max_workers=self.UPLOAD_WORKERS) as executor:
+            futures = [executor.submit(self._upload_batch, batch, session_id) for batch in batches]
+            for future in as_completed(futures):
+                uploaded_files.extend(future.result().get("uploaded_files", []))
+        
+        self.session_id = session_id
+        self._uploaded_fingerprint = fingerprint
+        return {"message": "Files uploaded successfully.", "session_id": session_id,
+                "uploaded_files": uploaded_files}
+    
+    def _upload_batch(self, batch, session_id):
+        from requests_toolbelt.multipart.encoder import MultipartEncoder
+        
+        with contextlib.ExitStack() as stack:
+            fields = [
+                ('files', (relative_path, stack.enter_context(LazyFile(file_path)), 'application/dicom'))
+                for file_path, relative_path in batch
+            ]
+            encoder = MultipartEncoder(fields=fields)
+            response = self.http.post(f"{self.backend_url}/upload-folder/",
+                                      params={"session_id": session_id}, data=encoder,
+                                      headers={'Content-Type': encoder.content_type},
+                                      # Connect/read limits, like the async client's; a batch may take
+                                      # long to send, but a backend that stops answering fails the upload
+                                      timeout=(5, 300))
+        response.raise_for_status()
         return response.json()
     
-    def process_weekly(self, e):
-        if not self.selected_folder:
-            return
-        def process_thread():
-            try:
-                self.weekly_btn.disabled = True
-                self.weekly_btn.text = "Processing..."
-                if self.page:
-                    self.page.update()
-                self.upload_files(self.selected_folder)
-                response = requests.post(f"{self.backend_url}/process-folder/", timeout=300)
-                if response.status_code == 200:
-                    result = response.json()
-                    self.weekly_results = result.get('results', [])
-                else:
-                    self.weekly_results = []
-                self.update_results_display()
-            except Exception as ex:
-                print(f"Error: {ex}")
-            finally:
-                self.weekly_btn.disabled = False
-                self.weekly_btn.text = "Process Weekly"
-                if self.page:
-                    self.page.update()
-        threading.Thread(target=process_thread, daemon=True).start()
+    def _store_result(self, kind, result):
+        _, store_attr, result_key, empty = self._JOBS[kind]
+        if result is None:
+            setattr(self, store_attr, empty())
+        else:
+            setattr(self, store_attr, result.get(result_key, empty()) if result_key else result)
     
-    def process_nema(self, e):
-        if not self.selected_folder:
-            return
-        def process_thread():
-            try:
-                self.nema_btn.disabled = True
-                self.nema_btn.text = "Processing..."
-                if self.page:
-                    self.page.update()
-                self.upload_files(self.selected_folder)
-                response = requests.post(f"{self.backend_url}/process-nema-body/", timeout=300)
-                if response.status_code == 200:
-                    result = response.json()
-                    self.nema_results = result.get('results', {})
-                else:
-                    self.nema_results = {}
-                self.update_results_display()
-            except Exception as ex:
-                print(f"Error: {ex}")
-            finally:
-                self.nema_btn.disabled = False
-                self.nema_btn.text = "Process NEMA Body"
-                if self.page:
-                    self.page.update()
-        threading.Thread(target=process_thread, daemon=True).start()
+    def _start_job(self, kind, e):
+        self.page.run_task(self._run_job, kind, e.control)
     
-    def process_torso(self, e):
+    async def _run_job(self, kind, btn):
         if not self.selected_folder:
             return
-        def process_thread():
-            try:
-                self.torso_btn.disabled = True
-                self.torso_btn.text = "Processing..."
-                if self.page:
-                    self.page.update()
-                self.upload_files(self.selected_folder)
-                response = requests.post(f"{self.backend_url}/process-torso/", timeout=300)
-                if response.status_code == 200:
-                    self.torso_results = response.json()
-                else:
-                    self.torso_results = {'combined_results': [], 'element_results': []}
-                self.update_results_display()
-            except Exception as ex:
-                print(f"Error: {ex}")
-            finally:
-                self.torso_btn.disabled = False
-                self.torso_btn.text = "Process Torso"
-                if self.page:
-                    self.page.update()
-        threading.Thread(target=process_thread, daemon=True).start()
+        label = btn.text
+        try:
+            btn.disabled = True
+            btn.text = "Processing..."
+            self.clear_previous_results(kind)
+            await asyncio.to_thread(self.upload_files, self.selected_folder)
+            response = await self.client.post(f"{self.backend_url}{self._JOBS[kind][0]}", params={"session_id": self.session_id})
+            if response.status_code != 200:
+                # The session may be gone on the backend; upload again next time
+                self._uploaded_fingerprint = None
+            self._store_result(kind, orjson.loads(response.content) if response.status_code == 200 else None)
+            self.update_results_display()
+        except Exception as ex:
+            self._uploaded_fingerprint = None
+            print(f"Error: {ex}")
+        finally:
+            btn.disabled = False
+            btn.text = label
+            self.page.update()
     
-    def process_head_neck(self, e):
+    async def _run_all(self):
         if not self.selected_folder:
             return
-        def process_thread():
-            try:
-                self.head_neck_btn.disabled = True
-                self.head_neck_btn.text = "Processing..."
-                if self.page:
-                    self.page.update()
-                self.upload_files(self.selected_folder)
-                response = requests.post(f"{self.backend_url}/process-head-neck/", timeout=300)
-                if response.status_code == 200:
-                    self.headneck_results = response.json()
-                else:
-                    self.headneck_results = {'combined_results': [], 'element_results': []}
-                self.update_results_display()
-            except Exception as ex:
-                print(f"Error: {ex}")
-            finally:
-                self.head_neck_btn.disabled = False
-                self.head_neck_btn.text = "Process Head and Neck"
-                if self.page:
-                    self.page.update()
-        threading.Thread(target=process_thread, daemon=True).start()
+        buttons = [self.weekly_btn, self.nema_btn, self.torso_btn, self.head_neck_btn, self.process_all_btn]
+        try:
+            for btn in buttons:
+                btn.disabled = True
+            self.process_all_btn.text = "Processing..."
+            self.clear_previous_results(*self._JOBS)
+            # Upload once; the backend runs all four analyses at the same time and streams
+            # each result back as it finishes, so tables appear as soon as they are ready
+            await asyncio.to_thread(self.upload_files, self.selected_folder)
+            async with self.client.stream("POST", f"{self.backend_url}/process-stream/",
+                                          params={"session_id": self.session_id}) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    event = orjson.loads(line[len("data: "):])
+                    if "error" in event:
+                        print(f"Error in {event['job']}: {event['error']}")
+                    self._store_result(event["job"], event.get("result"))
+                    self.update_results_display()
+        except Exception as ex:
+            self._uploaded_fingerprint = None
+            print(f"Error: {ex}")
+        finally:
+            for btn in buttons:
+                btn.disabled = False
+            self.process_all_btn.text = "Process All"
+            self.page.update()
+    
+    def process_all(self, e):
+        self.page.run_task(self._run_all)
     
-    def create_table(self, data, headers, title, bgcolor="#1976d2"):
+    def create_table(self, data, headers, title, bgcolor="#1976d2", kind=None):
         if not data:
             return ft.Container()
-        header_cells = [ft.DataCell(ft.Text(h, color=ft.Colors.WHITE, weight=ft.FontWeight.BOLD)) for h in headers]
-        header_row = ft.DataRow(cells=header_cells, color=bgcolor)
-        rows = [header_row]
-        for item in data:
-            cells = []
-            for header in headers:
-                value = item.get(header, "")
-                if isinstance(value, (int, float)):
-                    cells.append(ft.DataCell(ft.Text(f"{value:.2f}" if isinstance(value, float) else str(value))))
-                else:
-                    cells.append(ft.DataCell(ft.Text(str(value))))
-            rows.append(ft.DataRow(cells=cells))
+        # Reuse the built controls while this table slot still shows the same result object;
+        # a new result replaces the slot's entry, so at most one table per slot is kept
+        key = (kind, title)
+        cached = self._table_cache.get(key)
+        if cached is not None and cached[0] is data:
+            return cached[1]
+        # pandas is only needed once results arrive, so keep it off the startup path
+        import pandas as pd
+        
+        # Pick one formatter per column from its dtype and format whole columns at once;
+        # mixed columns come out as object dtype and use the generic str formatter
+        df = pd.DataFrame.from_records(data, columns=headers)
+        fmts = ["{:.2f}".format if pd.api.types.is_float_dtype(dtype) else str for dtype in df.dtypes]
+        formatted = pd.DataFrame({j: df.iloc[:, j].map(fmt) for j, fmt in enumerate(fmts)})
+        formatted = formatted.mask(df.isna().to_numpy(), "")
+        # Plain tuples per row for the cell-building loop
+        mat = list(formatted.itertuples(index=False, name=None))
+        if len(mat) > self.VIRTUAL_TABLE_THRESHOLD:
+            table = self._virtual_table(mat, headers, title, bgcolor)
+        else:
+            header_cells = [ft.DataCell(ft.Text(h, color=ft.Colors.WHITE, weight=ft.FontWeight.BOLD)) for h in headers]
+            header_row = ft.DataRow(cells=header_cells, color=bgcolor)
+            rows = [header_row]
+            rows.extend(ft.DataRow(cells=[ft.DataCell(ft.Text(value)) for value in row]) for row in mat)
+            table = ft.Column([
+                ft.Text(title, size=20, weight=ft.FontWeight.BOLD, color=ft.Colors.BLACK),
+                ft.DataTable(
+                    columns=[ft.DataColumn(ft.Text("")) for _ in headers],
+                    rows=rows,
+                    border=ft.Border.all(1, ft.Colors.GREY_400),
+                    bgcolor=ft.Colors.WHITE,
+                    heading_row_color=bgcolor,
+                )
+            ], spacing=10)
+        self._table_cache[key] = (data, table)
+        return table
+    
+    def _virtual_table(self, mat, headers, title, bgcolor):
+        # Large tables: only materialize rows as the user scrolls towards them
+        def make_row(values):
+            return ft.Row([ft.Container(ft.Text(v), width=self.VIRTUAL_CELL_WIDTH) for v in values])
+        
+        list_view = ft.ListView(spacing=2, item_extent=32, height=400)
+        list_view.controls = [make_row(row) for row in mat[:self.VIRTUAL_PAGE_SIZE]]
+        
+        def on_scroll(e):
+            loaded = len(list_view.controls)
+            if loaded < len(mat) and e.pixels >= e.max_scroll_extent - 10 * 32:
+                list_view.controls.extend(make_row(row) for row in mat[loaded:loaded + self.VIRTUAL_PAGE_SIZE])
+                list_view.update()
+        
+        list_view.on_scroll = on_scroll
+        header = ft.Container(
+            content=ft.Row([
+                ft.Container(ft.Text(h, color=ft.Colors.WHITE, weight=ft.FontWeight.BOLD),
+                             width=self.VIRTUAL_CELL_WIDTH)
+                for h in headers
+            ]),
+            bgcolor=bgcolor, padding=10
+        )
         return ft.Column([
-            ft.Text(title, size=20, weight=ft.FontWeight.BOLD, color=ft.Colors.BLACK),
-            ft.DataTable(
-                columns=[ft.DataColumn(ft.Text("")) for _ in headers],
-                rows=rows,
-                border=ft.Border.all(1, ft.Colors.GREY_400),
-                bgcolor=ft.Colors.WHITE,
-                heading_row_color=bgcolor,
-            )
+            ft.Text(f"{title} ({len(mat)} rows)", size=20, weight=ft.FontWeight.BOLD, color=ft.Colors.BLACK),
+            header,
+            ft.Container(content=list_view, border=ft.Border.all(1, ft.Colors.GREY_400),
+                         bgcolor=ft.Colors.WHITE, padding=10)
         ], spacing=10)
     
-    def download_weekly_results(self, e):
-        try:
-            response = requests.get(f"{self.backend_url}/download-metrics", timeout=30)
-            if response.status_code == 200:
-                downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
-                file_path = os.path.join(downloads_path, "weekly_metrics.xlsx")
-                with open(file_path, 'wb') as f:
-                    f.write(response.content)
-                print(f"Weekly results downloaded to: {file_path}")
-        except Exception as ex:
-            print(f"Download error: {ex}")
-    
-    def download_nema_results(self, e):
-        try:
-            response = requests.get(f"{self.backend_url}/download-nema-body", timeout=30)
-            if response.status_code == 200:
-                downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
-                file_path = os.path.join(downloads_path, "nema_body_metrics.xlsx")
-                with open(file_path, 'wb') as f:
-                    f.write(response.content)
-                print(f"NEMA body results downloaded to: {file_path}")
-        except Exception as ex:
-            print(f"Download error: {ex}")
-    
-    def download_torso_results(self, e):
-        try:
-            response = requests.get(f"{self.backend_url}/download-torso", timeout=30)
-            if response.status_code == 200:
-                downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
-                file_path = os.path.join(downloads_path, "torso_coil_analysis.xlsx")
-                with open(file_path, 'wb') as f:
-                    f.write(response.content)
-                print(f"Torso results downloaded to: {file_path}")
-        except Exception as ex:
-            print(f"Download error: {ex}")
+    async def _download(self, kind):
+        # Blocking transfer runs on a worker thread; the handler itself stays on the event loop
+        await asyncio.to_thread(self._fetch_download, kind)
     
-    def download_headneck_results(self, e):
+    def _fetch_download(self, kind):
+        endpoint, filename, label = self._DOWNLOADS[kind]
         try:
-            response = requests.get(f"{self.backend_url}/download-head-neck", timeout=30)
-            if response.status_code == 200:
-                downloads_path = os.path.join(os.path.expanduser("~"), "Downloads")
-                file_path = os.path.join(downloads_path, "headneck_analysis.xlsx")
-                with open(file_path, 'wb') as f:
-                    f.write(response.content)
-                print(f"Head & Neck results downloaded to: {file_path}")
+            # Stream straight to disk instead of buffering the workbook in memory, into a
+            # temporary file that is renamed over the target so a failed download never
+            # leaves a truncated workbook behind
+            file_path = self._downloads_dir / filename
+            with self.http.get(f"{self.backend_url}{endpoint}", stream=True, timeout=300) as response:
+                response.raise_for_status()
+                tmp = tempfile.NamedTemporaryFile(dir=self._downloads_dir, prefix='.' + filename + '.', delete=False)
+                try:
+                    with tmp:
+                        for chunk in response.iter_content(chunk_size=65536):
+                            tmp.write(chunk)
+                    os.replace(tmp.name, file_path)
+                except BaseException:
+                    with contextlib.suppress(OSError):
+                        os.unlink(tmp.name)
+                    raise
+            print(f"{label} results downloaded to: {file_path}")
         except Exception as ex:
             print(f"Download error: {ex}")
     
-    def open_output_folder(self, e):
+    async def open_output_folder(self, e):
+        if self._output_folder_path:
+            print(f"Output folder is located at: {self._output_folder_path}")
+            return
         try:
-            response = requests.get(f"{self.backend_url}/output-folder-path", timeout=10)
+            response = await asyncio.to_thread(
+                self.http.get, f"{self.backend_url}/output-folder-path", timeout=10
+            )
             if response.status_code == 200:
-                folder_info = response.json()
+                folder_info = orjson.loads(response.content)
                 folder_path = folder_info.get("path")
                 if folder_path and folder_info.get("exists", False):
+                    # Only cache once the folder exists; until then keep asking the backend
+                    self._output_folder_path = folder_path
                     print(f"Output folder is located at: {folder_path}")
                 else:
                     print("Output folder does not exist yet.")
@@ -290,7 +484,8 @@ class MRIAnalysisApp:
     def update_results_display(self):
         if not self.results_container:
             return
-        self.results_container.controls.clear()
+        # Build the full control list locally and hand it to Flet in one update
+        new_controls: list[ft.Control] = []
         
         if self.weekly_results is not None:
             if self.weekly_results:
@@ -298,17 +493,18 @@ class MRIAnalysisApp:
                     self.weekly_results,
                     ["Filename", "Mean", "Min", "Max", "Sum", "StDev", "SNR", "PIU"],
                     "Weekly Processing Results",
-                    ft.Colors.BLUE_600
+                    ft.Colors.BLUE_600,
+                    kind="weekly"
                 )
-                self.results_container.controls.append(table)
+                new_controls.append(table)
             else:
-                self.results_container.controls.append(
+                new_controls.append(
                     ft.Text("Weekly Processing: No valid DICOM files found",
                            size=16, color=ft.Colors.ORANGE_600, weight=ft.FontWeight.BOLD)
                 )
-            self.results_container.controls.append(
+            new_controls.append(
                 ft.Button("Download Weekly Results", icon="download",
-                         on_click=self.download_weekly_results,
+                         on_click=lambda e, k="weekly": self.page.run_task(self._download, k),
                          style=ft.ButtonStyle(bgcolor=ft.Colors.BLUE_600, color=ft.Colors.WHITE))
             )
         
@@ -320,22 +516,23 @@ class MRIAnalysisApp:
                             group_data,
                             ["Orientation", "Type", "Mean", "Min", "Max", "Sum", "StDev", "SNR", "PIU"],
                             f"NEMA Body Results - {group_name}",
-                            ft.Colors.PURPLE_600
+                            ft.Colors.PURPLE_600,
+                            kind="nema"
                         )
-                        self.results_container.controls.append(table)
+                        new_controls.append(table)
                 if not any(self.nema_results.values()):
-                    self.results_container.controls.append(
+                    new_controls.append(
                         ft.Text("NEMA Body Processing: No valid DICOM image files found",
                                size=16, color=ft.Colors.ORANGE_600, weight=ft.FontWeight.BOLD)
                     )
             else:
-                self.results_container.controls.append(
+                new_controls.append(
                     ft.Text("NEMA Body Processing: No valid DICOM image files found",
                            size=16, color=ft.Colors.ORANGE_600, weight=ft.FontWeight.BOLD)
                 )
-            self.results_container.controls.append(
+            new_controls.append(
                 ft.Button("Download NEMA Body Results", icon="download",
-                         on_click=self.download_nema_results,
+                         on_click=lambda e, k="nema": self.page.run_task(self._download, k),
                          style=ft.ButtonStyle(bgcolor=ft.Colors.PURPLE_600, color=ft.Colors.WHITE))
             )
         
@@ -346,27 +543,29 @@ class MRIAnalysisApp:
                     self.torso_results['combined_results'],
                     ["Region", "Signal Max", "Signal Min", "Signal Mean", "Noise SD", "SNR", "Uniformity"],
                     "Torso Results - Combined Views",
-                    ft.Colors.GREEN_600
+                    ft.Colors.GREEN_600,
+                    kind="torso"
                 )
-                self.results_container.controls.append(table)
+                new_controls.append(table)
                 has_results = True
             if self.torso_results.get('element_results'):
                 table = self.create_table(
                     self.torso_results['element_results'],
                     ["Element", "Signal Mean", "Noise SD", "SNR"],
                     "Torso Results - Individual Elements",
-                    ft.Colors.GREEN_600
+                    ft.Colors.GREEN_600,
+                    kind="torso"
                 )
-                self.results_container.controls.append(table)
+                new_controls.append(table)
                 has_results = True
             if not has_results:
-                self.results_container.controls.append(
+                new_controls.append(
                     ft.Text("Torso Processing: No valid DICOM files found",
                            size=16, color=ft.Colors.ORANGE_600, weight=ft.FontWeight.BOLD)
                 )
-            self.results_container.controls.append(
+            new_controls.append(
                 ft.Button("Download Torso Results", icon="download",
-                         on_click=self.download_torso_results,
+                         on_click=lambda e, k="torso": self.page.run_task(self._download, k),
                          style=ft.ButtonStyle(bgcolor=ft.Colors.GREEN_600, color=ft.Colors.WHITE))
             )
         
@@ -377,27 +576,29 @@ class MRIAnalysisApp:
                     self.headneck_results['combined_results'],
                     ["Region", "Signal Max", "Signal Min", "Signal Mean", "Noise SD", "SNR", "Uniformity"],
                     "Head & Neck Results - Combined Views",
-                    ft.Colors.ORANGE_600
+                    ft.Colors.ORANGE_600,
+                    kind="headneck"
                 )
-                self.results_container.controls.append(table)
+                new_controls.append(table)
                 has_results = True
             if self.headneck_results.get('element_results'):
                 table = self.create_table(
                     self.headneck_results['element_results'],
                     ["Element", "Signal Mean", "Noise SD", "SNR"],
                     "Head & Neck Results - Individual Elements",
-                    ft.Colors.ORANGE_600
+                    ft.Colors.ORANGE_600,
+                    kind="headneck"
                 )
-                self.results_container.controls.append(table)
+                new_controls.append(table)
                 has_results = True
             if not has_results:
-                self.results_container.controls.append(
+                new_controls.append(
                     ft.Text("Head & Neck Processing: No valid DICOM files found",
                            size=16, color=ft.Colors.ORANGE_600, weight=ft.FontWeight.BOLD)
                 )
-            self.results_container.controls.append(
+            new_controls.append(
                 ft.Button("Download Head & Neck Results", icon="download",
-                         on_click=self.download_headneck_results,
+                         on_click=lambda e, k="headneck": self.page.run_task(self._download, k),
                          style=ft.ButtonStyle(bgcolor=ft.Colors.ORANGE_600, color=ft.Colors.WHITE))
             )
         
@@ -405,7 +606,7 @@ class MRIAnalysisApp:
             self.nema_results is not None or
             self.torso_results is not None or
             self.headneck_results is not None):
-            self.results_container.controls.append(
+            new_controls.append(
                 ft.Container(
                     content=ft.Button("Open Output Folder", icon="folder_open",
                                      on_click=self.open_output_folder,
@@ -414,11 +615,25 @@ class MRIAnalysisApp:
                 )
             )
         
+        self.results_container.controls[:] = new_controls
         if self.page:
             self.page.update()
     
+    def on_disconnect(self, e):
+        self.http.close()
+        if self.client:
+            self.page.run_task(self.client.aclose)
+    
     def main(self, page: ft.Page):
         self.page = page
+        # Long-lived async client bound to the page's event loop for process jobs, reusing
+        # keep-alive connections to the local backend. No base_url: requests read
+        # self.backend_url each time, since the backend's port can change after startup
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+            timeout=httpx.Timeout(300, connect=5)
+        )
+        page.on_disconnect = self.on_disconnect
         page.title = "MRI DICOM Analysis"
         page.theme_mode = ft.ThemeMode.LIGHT
         page.padding = 20
@@ -433,25 +648,30 @@ class MRIAnalysisApp:
         self.folder_text = ft.Text("No folder selected", size=14, color=ft.Colors.GREY_600)
         
         self.weekly_btn = ft.Button(
-            "Process Weekly", on_click=self.process_weekly,
+            "Process Weekly", on_click=functools.partial(self._start_job, "weekly"),
             style=ft.ButtonStyle(bgcolor=ft.Colors.BLUE_600, color=ft.Colors.WHITE),
             width=200, height=50
         )
         self.nema_btn = ft.Button(
-            "Process NEMA Body", on_click=self.process_nema,
+            "Process NEMA Body", on_click=functools.partial(self._start_job, "nema"),
             style=ft.ButtonStyle(bgcolor=ft.Colors.PURPLE_600, color=ft.Colors.WHITE),
             width=200, height=50
         )
         self.torso_btn = ft.Button(
-            "Process Torso", on_click=self.process_torso,
+            "Process Torso", on_click=functools.partial(self._start_job, "torso"),
             style=ft.ButtonStyle(bgcolor=ft.Colors.GREEN_600, color=ft.Colors.WHITE),
             width=200, height=50
         )
         self.head_neck_btn = ft.Button(
-            "Process Head and Neck", on_click=self.process_head_neck,
+            "Process Head and Neck", on_click=functools.partial(self._start_job, "headneck"),
             style=ft.ButtonStyle(bgcolor=ft.Colors.ORANGE_600, color=ft.Colors.WHITE),
             width=200, height=50
         )
+        self.process_all_btn = ft.Button(
+            "Process All", on_click=self.process_all,
+            style=ft.ButtonStyle(bgcolor=ft.Colors.TEAL_600, color=ft.Colors.WHITE),
+            width=200, height=50
+        )
         
         self.results_container = ft.Column(spacing=20, scroll=ft.ScrollMode.AUTO, expand=True)
         
@@ -473,7 +693,8 @@ class MRIAnalysisApp:
                 ),
                 ft.Container(
                     content=ft.Row([
-                        self.weekly_btn, self.nema_btn, self.torso_btn, self.head_neck_btn
+                        self.weekly_btn, self.nema_btn, self.torso_btn, self.head_neck_btn,
+                        self.process_all_btn
                     ], alignment=ft.MainAxisAlignment.CENTER, spacing=20),
                     margin=ft.Margin.only(bottom=20)
                 ),
@@ -487,7 +708,11 @@ class MRIAnalysisApp:
 def main():
     from desktop_backend import backend
     app = MRIAnalysisApp(backend)
-    ft.run(app.main, view=ft.AppView.FLET_APP)
+    try:
+        ft.run(app.main, view=ft.AppView.FLET_APP)
+    finally:
+        # Closing the window doesn't always fire on_disconnect; release pooled sockets on exit
+        app.http.close()
 
 if __name__ == "__main__":
     main()
@@ -3,25 +3,104 @@ import os
 import re
 import datetime
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import atexit
 import argparse
+import functools
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
 import numpy as np
 import pandas as pd
 import scipy.io as sio
+from scipy import ndimage as ndi
 import pydicom
 # matplotlib imports removed for desktop app
 from skimage import measure, filters, morphology
 
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; fall back to NumPy masks and reductions
+    njit = None
+    prange = range
+
 # Configure logging
 today_str = datetime.datetime.now().strftime("%Y_%m_%d")
 log_dir = os.path.join(os.getcwd(), 'outputs')
 os.makedirs(log_dir, exist_ok=True)
 log_path = os.path.join(log_dir, 'headneck_automation.log')
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s:%(levelname)s:%(message)s',
-    filename=log_path,
-    filemode='w'
-)
+# Sidecar index of classification tags, keyed by path within the analysed folder with
+# (mtime_ns, size), so it carries over between upload sessions of the same data
+TAG_INDEX_PATH = os.path.join(log_dir, 'headneck_index.json')
+
+# Worker processes are always spawned: forking a process that already runs server and
+# listener threads can deadlock on locks those threads hold
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+_worker_pool = None
+_worker_log_queue = None
+
+def configure_logging(level=logging.INFO):
+    # Like basicConfig, leave an already configured root logger alone. Records go through a
+    # queue so threads in the scan pools never block on the file write; a listener thread
+    # drains it into the log file. The queue is cross-process and doubles as the worker
+    # pool's log queue, so records from the analysis workers land in the same file.
+    global _worker_log_queue
+    root = logging.getLogger()
+    if root.handlers:
+        return None
+    file_handler = logging.FileHandler(log_path, mode='w')
+    file_handler.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(message)s'))
+    log_queue = _worker_log_queue = _MP_CONTEXT.Queue(-1)
+    listener = QueueListener(log_queue, file_handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+# Parent process only: spawned workers re-import this module and would otherwise
+# truncate the log with mode='w'. The per-ROI diagnostics are DEBUG records, kept out of
+# the analysis loops by default; HEADNECK_LOG_LEVEL=DEBUG brings them back.
+if multiprocessing.parent_process() is None:
+    configure_logging(getattr(logging, os.environ.get("HEADNECK_LOG_LEVEL", "INFO").upper(), logging.INFO))
+
+class _ForwardToLogger(logging.Handler):
+    # Replays a worker's record through the parent's logger of the same name, so it reaches
+    # whatever handlers the parent has configured
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
+
+def worker_log_queue():
+    """Cross-process queue that worker records are sent through, drained in this process"""
+    global _worker_log_queue
+    if _worker_log_queue is None:
+        _worker_log_queue = _MP_CONTEXT.Queue(-1)
+        listener = QueueListener(_worker_log_queue, _ForwardToLogger())
+        listener.start()
+        atexit.register(listener.stop)
+    return _worker_log_queue
+
+def _init_worker(log_queue, level):
+    # Spawned workers start with no handlers; send everything back to the parent
+    root = logging.getLogger()
+    root.handlers[:] = [QueueHandler(log_queue)]
+    root.setLevel(level)
+
+def worker_pool() -> ProcessPoolExecutor:
+    """Return the shared pool for the per-orientation and per-element analyses"""
+    global _worker_pool
+    if _worker_pool is None:
+        # Created once: every spawned worker re-imports the app's entry script, which is
+        # too costly to repeat on each analysis run
+        _worker_pool = ProcessPoolExecutor(
+            max_workers=min(os.cpu_count() or 1, 3 + len(ELEMENT_LABELS)),
+            mp_context=_MP_CONTEXT,
+            initializer=_init_worker,
+            initargs=(worker_log_queue(), logging.getLogger().getEffectiveLevel()),
+        )
+        atexit.register(_worker_pool.shutdown)
+    return _worker_pool
 
 # Constants - Head & Neck elements (10): same names as torso minus VAP3, VPP3
 ELEMENT_LABELS = [
@@ -34,22 +113,24 @@ ELEMENT_LABELS = [
 NOISE_AREA_MM2 = 340 * 100        # 340 cm^2 = 34000 mm^2 (noise)
 SIGNAL_AREA_MM2 = 338 * 100      # 338 cm^2 = 33800 mm^2 (combined signal ROI, same as torso)
 SIGNAL_RADIUS_MM = 3
+# File reads release the GIL, so header scanning scales with threads beyond the core count
+IO_WORKERS = min(32, (os.cpu_count() or 1) * 4)
 
 # Helper Functions
 def is_dicom_file(file_path: str) -> bool:
+    # The 'DICM' magic at offset 128 is enough to accept a file; classify_files parses the
+    # header later anyway
     try:
         with open(file_path, 'rb') as f:
             preamble = f.read(132)
-            if preamble[-4:] != b'DICM':
-                return False
-        _ = pydicom.dcmread(file_path, stop_before_pixels=True, force=True)
-        return True
+        return preamble[-4:] == b'DICM'
     except Exception:
         return False
 
 def load_dicom_image(file_path: str):
     ds = pydicom.dcmread(file_path)
-    image = ds.pixel_array.astype(np.float64)
+    # Stored pixels are 12-16 bit integers, which float32 represents exactly at half the bandwidth of float64
+    image = ds.pixel_array.astype(np.float32, copy=False)
     pixel_spacing = get_pixel_spacing(ds)
     return image, pixel_spacing
 
@@ -65,6 +146,71 @@ def compute_metrics(image: np.ndarray, mask: np.ndarray):
     data = image[mask == 1]
     return float(np.max(data)), float(np.min(data)), float(np.mean(data))
 
+def masked_mean_std(image: np.ndarray, mask: np.ndarray) -> tuple:
+    # Weighted reductions over the full image instead of gathering the ROI pixels into a new
+    # array; accumulate in float64 so the sum of squares doesn't lose precision
+    weights = mask.astype(np.float32, copy=False)
+    n = np.count_nonzero(mask)
+    total = np.einsum('ij,ij->', image, weights, dtype=np.float64)
+    total_sq = np.einsum('ij,ij,ij->', image, image, weights, dtype=np.float64)
+    mean = total / n
+    return float(mean), float(np.sqrt(max(total_sq / n - mean * mean, 0.0)))
+
+# Fused "circle mask + mean + sum of squares" over one image, without building the mask.
+# Only the rows the circle covers are visited, and each row is summed over its exact
+# [cx - half, cx + half] span, so the inner loop has no per-pixel distance test.
+# Rows are reduced in parallel into per-row partials, then combined.
+def _circle_mean_std_kernel(image, center_y, center_x, r2):
+    height, width = image.shape
+    reach = int(np.sqrt(r2)) + 1
+    y0 = max(center_y - reach, 0)
+    y1 = min(center_y + reach + 1, height)
+    rows = max(y1 - y0, 0)
+    row_n = np.zeros(rows, np.int64)
+    row_sum = np.zeros(rows)
+    row_sq = np.zeros(rows)
+    for i in prange(rows):
+        dy = y0 + i - center_y
+        rem = r2 - dy * dy
+        if rem < 0:
+            continue
+        # Largest half-width with half * half <= rem, corrected for sqrt rounding
+        half = int(np.sqrt(rem))
+        while (half + 1) * (half + 1) <= rem:
+            half += 1
+        while half * half > rem:
+            half -= 1
+        x0 = max(center_x - half, 0)
+        x1 = min(center_x + half + 1, width)
+        total = 0.0
+        total_sq = 0.0
+        for x in range(x0, x1):
+            v = float(image[y0 + i, x])
+            total += v
+            total_sq += v * v
+        row_n[i] = max(x1 - x0, 0)
+        row_sum[i] = total
+        row_sq[i] = total_sq
+    out = np.full(2, np.nan)
+    n = row_n.sum()
+    if n == 0:
+        return out
+    mean = row_sum.sum() / n
+    out[0] = mean
+    out[1] = np.sqrt(max(row_sq.sum() / n - mean * mean, 0.0))
+    return out
+
+if njit is not None:
+    _circle_mean_std_numba = njit(parallel=True, fastmath=True, cache=True)(_circle_mean_std_kernel)
+
+def circle_mean_std(image: np.ndarray, center_y, center_x, radius) -> tuple:
+    """Return (mean, std) of the image pixels inside the circle."""
+    if njit is not None:
+        out = _circle_mean_std_numba(image, int(center_y), int(center_x), float(radius) ** 2)
+        return float(out[0]), float(out[1])
+    height, width = image.shape
+    return masked_mean_std(image, circle_mask(height, width, center_y, center_x, radius))
+
 def compute_snr(signal_mean: float, noise_std: float, is_individual: bool = False) -> float:
     multiplier = 0.66 if is_individual else 0.7
     return round(multiplier * signal_mean / noise_std, 1)
@@ -75,11 +221,33 @@ def compute_uniformity(signal_max: float, signal_min: float) -> float:
         return 0.0
     return round(100.0 * (1 - ((signal_max - signal_min) / denom)), 1)
 
+@functools.lru_cache(maxsize=8)
+def _yx_grid(height: int, width: int) -> tuple:
+    # Image shapes repeat across a study, so build the broadcastable coordinate axes once per shape
+    Y = np.arange(height)[:, None]
+    X = np.arange(width)[None, :]
+    Y.setflags(write=False)
+    X.setflags(write=False)
+    return Y, X
+
+def circle_mask(height: int, width: int, center_y, center_x, radius) -> np.ndarray:
+    Y, X = _yx_grid(height, width)
+    dy = Y - center_y
+    dx = X - center_x
+    return (dx * dx + dy * dy) <= radius * radius
+
 def detect_circular_object(image):
     h, w = image.shape
     central = image[h//4:3*h//4, w//4:3*w//4]
     threshold = 0.25 * np.max(central)
     binary_mask = image > threshold
+    # Same 8-connectivity as measure.label below
+    _, n_components = ndi.label(binary_mask, structure=np.ones((3, 3), dtype=bool))
+    area = np.count_nonzero(binary_mask)
+    if n_components == 1 and area >= 500:
+        # The phantom is the only blob, so it is the largest region: one centroid pass is enough
+        center_y, center_x = ndi.center_of_mass(binary_mask)
+        return int(center_y), int(center_x), int(np.sqrt(area / np.pi))
     binary_mask = morphology.remove_small_objects(binary_mask, min_size=500)
     labeled_mask = measure.label(binary_mask)
     regions = measure.regionprops(labeled_mask, intensity_image=image)
@@ -91,8 +259,7 @@ def detect_circular_object(image):
     radius = np.sqrt(largest_region.area / np.pi)
     return int(center_y), int(center_x), int(radius)
 
-def create_circular_roi_nema_style(image, pixel_spacing, desired_area_mm2=SIGNAL_AREA_MM2, show_plot=False):
-    height, width = image.shape
+def nema_roi_geometry(image, pixel_spacing, desired_area_mm2=SIGNAL_AREA_MM2) -> tuple:
     x_spacing, y_spacing = pixel_spacing
     radius_mm = np.sqrt(desired_area_mm2 / np.pi)
     radius_pixels = max(1, round(radius_mm / x_spacing))
@@ -102,19 +269,25 @@ def create_circular_roi_nema_style(image, pixel_spacing, desired_area_mm2=SIGNAL
         logging.warning("Computed ROI radius is too small, defaulting to 1 pixel.")
         radius_pixels = 1
     logging.debug(f"ROI: phantom center=({center_x},{center_y}), phantom_r={object_radius}, roi_r={radius_pixels}")
-    Y, X = np.ogrid[:height, :width]
-    mask = ((X - center_x) ** 2 + (Y - center_y) ** 2) <= radius_pixels ** 2
+    return center_y, center_x, radius_pixels
+
+def create_circular_roi_nema_style(image, pixel_spacing, desired_area_mm2=SIGNAL_AREA_MM2, show_plot=False):
+    height, width = image.shape
+    center_y, center_x, radius_pixels = nema_roi_geometry(image, pixel_spacing, desired_area_mm2)
+    mask = circle_mask(height, width, center_y, center_x, radius_pixels)
     return mask.astype(np.uint8)
 
-def create_central_circle_roi(image, pixel_spacing, desired_area_mm2=NOISE_AREA_MM2, show_plot=False):
+def central_roi_geometry(image, pixel_spacing, desired_area_mm2=NOISE_AREA_MM2) -> tuple:
     height, width = image.shape
-    center_y, center_x = height // 2, width // 2
     r_mm = np.sqrt(desired_area_mm2 / np.pi)
     avg_spacing = (pixel_spacing[0] + pixel_spacing[1]) / 2
-    r_pixels = r_mm / avg_spacing
+    return height // 2, width // 2, r_mm / avg_spacing
+
+def create_central_circle_roi(image, pixel_spacing, desired_area_mm2=NOISE_AREA_MM2, show_plot=False):
+    height, width = image.shape
+    center_y, center_x, r_pixels = central_roi_geometry(image, pixel_spacing, desired_area_mm2)
     # Visualization removed for desktop app
-    Y, X = np.ogrid[:height, :width]
-    mask = ((X - center_x) ** 2 + (Y - center_y) ** 2) <= r_pixels ** 2
+    mask = circle_mask(height, width, center_y, center_x, r_pixels)
     return mask.astype(np.uint8)
 
 def create_roi_mask(
@@ -151,8 +324,7 @@ def create_roi_mask(
     center_x = max(margin, min(width - margin, center_x))
     center_y = max(margin, min(height - margin, center_y))
 
-    Y, X = np.ogrid[:height, :width]
-    mask = ((X - center_x) ** 2 + (Y - center_y) ** 2) <= r_pixels ** 2
+    mask = circle_mask(height, width, center_y, center_x, r_pixels)
 
     if mode == 'signal':
         logging.debug(f"Signal ROI at ({center_x}, {center_y}), radius: {r_pixels:.1f} pixels")
@@ -167,26 +339,86 @@ def create_roi_mask(
 
     return mask.astype(np.uint8), center_x, center_y, r_pixels
 
-def classify_files(files: list) -> tuple:
+def read_tags(file_path: str):
+    """Return (series description, coil labels, Norm flag) for one file, or the exception raised."""
+    try:
+        ds = pydicom.dcmread(file_path, stop_before_pixels=True)
+        series_desc = getattr(ds, "SeriesDescription", "").lower()
+        coil_elem = ds.get((0x0051, 0x100F))
+        coil_string = coil_elem.value if coil_elem is not None else ""
+        coil_labels = [c.strip() for c in coil_string.split(';') if c.strip()]
+
+        # detect Norm filter from ImageType tag
+        is_norm = False
+        if hasattr(ds, 'ImageType'):
+            types = [t.upper() for t in ds.ImageType]
+            if 'NORM' in types:
+                is_norm = True
+        return series_desc, coil_labels, is_norm
+    except Exception as e:
+        return e
+
+def load_tag_index() -> dict:
+    try:
+        with open(TAG_INDEX_PATH, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_tag_index(index: dict):
+    # Replace the index atomically
+    tmp_path = TAG_INDEX_PATH + '.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, TAG_INDEX_PATH)
+    except OSError as e:
+        logging.warning(f"Could not save tag index: {e}")
+
+def classify_files(files: list, root: str = None) -> tuple:
     combined = {}
     individual = {}
 
+    # Reuse tags from the sidecar index for files whose mtime and size haven't changed,
+    # read the rest concurrently, then classify serially in the original file order.
+    # Entries are keyed relative to root: every upload lands in a new session directory,
+    # but files carried over from the previous session are hardlinks with the same stamp.
+    index = load_tag_index()
+    current = {}
+    tags = {}
+    stale = []
     for f in files:
         try:
-            ds = pydicom.dcmread(f, stop_before_pixels=True)
-            series_desc = getattr(ds, "SeriesDescription", "").lower()
-            coil_elem = ds.get((0x0051, 0x100F))
-            coil_string = coil_elem.value if coil_elem is not None else ""
+            st = os.stat(f)
+            stamp = [st.st_mtime_ns, st.st_size]
+        except OSError:
+            stamp = None
+        key = os.path.relpath(f, root) if root else os.path.abspath(f)
+        entry = index.get(key)
+        if entry is not None and entry[0] == stamp:
+            tags[f] = tuple(entry[1])
+            current[key] = entry
+        else:
+            stale.append((f, key, stamp))
+    if stale:
+        with ThreadPoolExecutor(max_workers=IO_WORKERS) as executor:
+            read = list(executor.map(read_tags, [f for f, _, _ in stale]))
+        for (f, key, stamp), result in zip(stale, read):
+            tags[f] = result
+            if stamp is not None and not isinstance(result, Exception):
+                current[key] = [stamp, list(result)]
+    # Keep only this folder's files, so the index stays the size of one dataset
+    if current != index:
+        save_tag_index(current)
+    logging.info(f"Tag index: {len(files) - len(stale)} cached, {len(stale)} read")
 
+    for f in files:
+        try:
+            result = tags[f]
+            if isinstance(result, Exception):
+                raise result
+            series_desc, coil_labels, is_norm = result
             orientation = next((ori for ori in ['tra', 'sag', 'cor'] if ori in series_desc), None)
-            coil_labels = [c.strip() for c in coil_string.split(';') if c.strip()]
-
-            # detect Norm filter from ImageType tag
-            is_norm = False
-            if hasattr(ds, 'ImageType'):
-                types = [t.upper() for t in ds.ImageType]
-                if 'NORM' in types:
-                    is_norm = True
 
             if len(coil_labels) == 1:
                 elem = coil_labels[0]
@@ -222,123 +454,140 @@ def save_mat_output(results_dir: str, coil_type: str, snr_list: list, piu_list:
     sio.savemat(mat_path, mat_data)
     logging.info(f"Saved .mat to {mat_path}")
 
+def _compute_combined(orientation: str, combined_files: dict):
+    # Process combined views (same structure as torso):
+    # SNR: Norm-OFF signal mean / Norm-OFF noise std
+    # Uniformity + Max/Min: from Norm-ON image
+    # Displayed Signal Mean: Norm-OFF mean (used for SNR)
+    snr_key = (orientation, 'image', False)        # Norm-OFF for SNR signal
+    noise_key = (orientation, 'noise', False)       # Norm-OFF for noise
+    uniform_key = (orientation, 'image', True)      # Norm-ON for uniformity
+
+    if snr_key not in combined_files:
+        logging.warning(f"No Norm-OFF signal for {orientation.upper()}, skipping.")
+        logging.warning(f"  Available: {[k for k in combined_files if k[0]==orientation]}")
+        return None
+    if noise_key not in combined_files:
+        alt_noise_key = (orientation, 'noise', True)
+        if alt_noise_key in combined_files:
+            noise_key = alt_noise_key
+            logging.info(f"Using Norm-ON noise for {orientation.upper()} (Norm-OFF not found)")
+        else:
+            logging.warning(f"No noise for {orientation.upper()}, skipping.")
+            return None
+
+    signal_path = combined_files[snr_key]
+    noise_path = combined_files[noise_key]
+
+    logging.info(f"Processing {orientation.upper()} SNR signal (Norm-OFF): {signal_path}")
+    logging.info(f"Processing {orientation.upper()} noise (Norm-OFF): {noise_path}")
+    signal_image, signal_spacing = load_dicom_image(signal_path)
+    noise_image, noise_spacing = load_dicom_image(noise_path)
+
+    # SNR from Norm-OFF
+    sig_roi = nema_roi_geometry(signal_image, signal_spacing)
+    noise_roi = central_roi_geometry(noise_image, noise_spacing)
+    sig_mean, _ = circle_mean_std(signal_image, *sig_roi)
+    _, noise_std = circle_mean_std(noise_image, *noise_roi)
+    snr = compute_snr(sig_mean, noise_std)
+
+    # Uniformity from Norm-ON
+    if uniform_key in combined_files:
+        uniform_path = combined_files[uniform_key]
+        logging.info(f"Processing {orientation.upper()} uniformity (Norm-ON): {uniform_path}")
+        uniform_image, uniform_spacing = load_dicom_image(uniform_path)
+        u_mask = create_circular_roi_nema_style(uniform_image, uniform_spacing, show_plot=False)
+        u_sig_max, u_sig_min, u_sig_mean = compute_metrics(uniform_image, u_mask)
+        uniformity = compute_uniformity(u_sig_max, u_sig_min)
+    else:
+        logging.warning(f"No Norm-ON image for {orientation.upper()}, using Norm-OFF for uniformity.")
+        sig_mask = circle_mask(*signal_image.shape, *sig_roi)
+        u_sig_max, u_sig_min, _ = compute_metrics(signal_image, sig_mask)
+        uniformity = compute_uniformity(u_sig_max, u_sig_min)
+
+    return {
+        'Region': orientation.upper(),
+        'Signal Max': u_sig_max,
+        'Signal Min': u_sig_min,
+        'Signal Mean': sig_mean,
+        'Noise SD': noise_std,
+        'SNR': snr,
+        'Uniformity': uniformity
+    }
+
+def _compute_element(elem: str, signal_path: str, noise_path: str) -> dict:
+    # Process individual elements (same as torso)
+    logging.info(f"Processing individual element {elem}: {signal_path}")
+    signal_image, signal_spacing = load_dicom_image(signal_path)
+    noise_image, noise_spacing = load_dicom_image(noise_path)
+
+    sig_mask, sig_cx, sig_cy, sig_r = create_roi_mask(
+        signal_image, signal_spacing,
+        mode='signal', find_max_intensity=True,
+        is_individual=True, element=elem
+    )
+    noise_mask, noise_cx, noise_cy, noise_r = create_roi_mask(
+        noise_image, noise_spacing,
+        mode='noise', is_individual=True, element=elem
+    )
+
+    # Visualization removed for desktop app
+
+    sig_mean, _ = circle_mean_std(signal_image, sig_cy, sig_cx, sig_r)
+    _, noise_std = circle_mean_std(noise_image, noise_cy, noise_cx, noise_r)
+    snr = compute_snr(sig_mean, noise_std, is_individual=True)
+
+    return {
+        'Element': elem,
+        'Signal Mean': sig_mean,
+        'Noise SD': noise_std,
+        'SNR': snr
+    }
+
 def process_hn_folder(folder: str) -> tuple:
+    global _worker_pool
 
-    dicom_files = []
-    for root, _, files in os.walk(folder):
-        for f in files:
-            full = os.path.join(root, f)
-            if is_dicom_file(full):
-                dicom_files.append(full)
+    paths = [os.path.join(root, f) for root, _, files in os.walk(folder) for f in files]
+    with ThreadPoolExecutor(max_workers=IO_WORKERS) as executor:
+        flags = list(executor.map(is_dicom_file, paths))
+    dicom_files = [path for path, ok in zip(paths, flags) if ok]
 
     if not dicom_files:
         logging.info("No DICOM files found in folder.")
         return [], []
 
-    combined_files, individual_files = classify_files(dicom_files)
+    combined_files, individual_files = classify_files(dicom_files, folder)
     logging.info(f"Classified Combined keys: {list(combined_files.keys())}")
     logging.info(f"Classified Individual keys: {list(individual_files.keys())}")
 
-    combined_results = []
-    element_results = []
-
-    # Process combined views (same structure as torso):
-    # SNR: Norm-OFF signal mean / Norm-OFF noise std
-    # Uniformity + Max/Min: from Norm-ON image
-    # Displayed Signal Mean: Norm-OFF mean (used for SNR)
-    for orientation in ['sag', 'tra', 'cor']:
-        snr_key = (orientation, 'image', False)        # Norm-OFF for SNR signal
-        noise_key = (orientation, 'noise', False)       # Norm-OFF for noise
-        uniform_key = (orientation, 'image', True)      # Norm-ON for uniformity
-
-        if snr_key not in combined_files:
-            logging.warning(f"No Norm-OFF signal for {orientation.upper()}, skipping.")
-            logging.warning(f"  Available: {[k for k in combined_files if k[0]==orientation]}")
-            continue
-        if noise_key not in combined_files:
-            alt_noise_key = (orientation, 'noise', True)
-            if alt_noise_key in combined_files:
-                noise_key = alt_noise_key
-                logging.info(f"Using Norm-ON noise for {orientation.upper()} (Norm-OFF not found)")
-            else:
-                logging.warning(f"No noise for {orientation.upper()}, skipping.")
-                continue
-
-        signal_path = combined_files[snr_key]
-        noise_path = combined_files[noise_key]
-
-        logging.info(f"Processing {orientation.upper()} SNR signal (Norm-OFF): {signal_path}")
-        logging.info(f"Processing {orientation.upper()} noise (Norm-OFF): {noise_path}")
-        signal_image, signal_spacing = load_dicom_image(signal_path)
-        noise_image, noise_spacing = load_dicom_image(noise_path)
-
-        # SNR from Norm-OFF
-        sig_mask = create_circular_roi_nema_style(signal_image, signal_spacing, show_plot=False)
-        noise_mask = create_central_circle_roi(noise_image, noise_spacing, show_plot=False)
-        sig_mean = float(np.mean(signal_image[sig_mask == 1]))
-        noise_std = float(np.std(noise_image[noise_mask == 1]))
-        snr = compute_snr(sig_mean, noise_std)
-
-        # Uniformity from Norm-ON
-        if uniform_key in combined_files:
-            uniform_path = combined_files[uniform_key]
-            logging.info(f"Processing {orientation.upper()} uniformity (Norm-ON): {uniform_path}")
-            uniform_image, uniform_spacing = load_dicom_image(uniform_path)
-            u_mask = create_circular_roi_nema_style(uniform_image, uniform_spacing, show_plot=False)
-            u_sig_max, u_sig_min, u_sig_mean = compute_metrics(uniform_image, u_mask)
-            uniformity = compute_uniformity(u_sig_max, u_sig_min)
-        else:
-            logging.warning(f"No Norm-ON image for {orientation.upper()}, using Norm-OFF for uniformity.")
-            u_sig_max, u_sig_min, _ = compute_metrics(signal_image, sig_mask)
-            uniformity = compute_uniformity(u_sig_max, u_sig_min)
-
-        combined_results.append({
-            'Region': orientation.upper(),
-            'Signal Max': u_sig_max,
-            'Signal Min': u_sig_min,
-            'Signal Mean': sig_mean,
-            'Noise SD': noise_std,
-            'SNR': snr,
-            'Uniformity': uniformity
-        })
-        logging.info(f"{orientation.upper()} - SNR: {snr}, Uniformity: {uniformity}, Max: {u_sig_max}, Min: {u_sig_min}, Mean: {sig_mean}, Noise SD: {noise_std}")
-
-
-    # Process individual elements (same as torso)
+    # Orientations and elements are independent; run them in worker processes so the
+    # skimage/NumPy work isn't serialized on the GIL. Only file paths cross the process boundary.
+    element_jobs = []
     for (elem, ftype), filepath in individual_files.items():
         if ftype != 'image':
             continue
-        logging.info(f"Processing individual element {elem}: {filepath}")
-        signal_image, signal_spacing = load_dicom_image(filepath)
         noise_key = (elem, 'noise')
         if noise_key not in individual_files:
             logging.warning(f"No noise for {elem}, skipping.")
             continue
-        noise_image, noise_spacing = load_dicom_image(individual_files[noise_key])
-
-        sig_mask, sig_cx, sig_cy, sig_r = create_roi_mask(
-            signal_image, signal_spacing,
-            mode='signal', find_max_intensity=True,
-            is_individual=True, element=elem
-        )
-        noise_mask, noise_cx, noise_cy, noise_r = create_roi_mask(
-            noise_image, noise_spacing,
-            mode='noise', is_individual=True, element=elem
-        )
+        element_jobs.append((elem, filepath, individual_files[noise_key]))
 
-        # Visualization removed for desktop app
-
-        _, _, sig_mean = compute_metrics(signal_image, sig_mask)
-        noise_std = float(np.std(noise_image[noise_mask == 1]))
-        snr = compute_snr(sig_mean, noise_std, is_individual=True)
-
-        element_results.append({
-            'Element': elem,
-            'Signal Mean': sig_mean,
-            'Noise SD': noise_std,
-            'SNR': snr
-        })
-        logging.info(f"{elem} - SNR: {snr}")
+    orientations = ['sag', 'tra', 'cor']
+    executor = worker_pool()
+    try:
+        combined_futures = [executor.submit(_compute_combined, ori, combined_files) for ori in orientations]
+        element_futures = [executor.submit(_compute_element, *job) for job in element_jobs]
+        combined_results = [r for r in (f.result() for f in combined_futures) if r]
+        element_results = [f.result() for f in element_futures]
+    except BrokenProcessPool:
+        # A crashed worker breaks the pool for good; start a fresh one on the next run
+        _worker_pool = None
+        raise
+
+    for row in combined_results:
+        logging.info(f"{row['Region']} - SNR: {row['SNR']}, Uniformity: {row['Uniformity']}, Max: {row['Signal Max']}, Min: {row['Signal Min']}, Mean: {row['Signal Mean']}, Noise SD: {row['Noise SD']}")
+    for row in element_results:
+        logging.info(f"{row['Element']} - SNR: {row['SNR']}")
 
     logging.info(f"Combined Results: {combined_results}")
     logging.info(f"Element Results: {element_results}")
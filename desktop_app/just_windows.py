@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 """
 Simple Windows-only build script for MRI DICOM Analysis Desktop Application
-Creates a single Windows executable with all functionality included.
+Creates a Windows application folder (executable plus its runtime) with all
+functionality included. A one-folder build starts much faster than --onefile,
+which unpacks the whole runtime to %TEMP% on every launch.
 """
 
 import os
@@ -9,7 +11,11 @@ import sys
 import platform
 import subprocess
 import shutil
+import importlib.util
+import hashlib
+import json
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 def check_platform():
     """Ensure we're building for Windows"""
@@ -21,33 +27,27 @@ def check_platform():
 
 def check_dependencies():
     """Check if all required packages are installed"""
-    required_packages = [
-        "PyInstaller",
-        "flet", 
-        "pandas",
-        "numpy",
-        "pydicom",
-        "scikit-image",
-        "scipy",
-        "openpyxl",
-        "fastapi",
-        "uvicorn",
-        "requests"
-    ]
+    # pip name -> import name; find_spec only locates each module, nothing is imported
+    required_packages = {
+        "PyInstaller": "PyInstaller",
+        "flet": "flet",
+        "pandas": "pandas",
+        "numpy": "numpy",
+        "pydicom": "pydicom",
+        "scikit-image": "skimage",
+        "scipy": "scipy",
+        "openpyxl": "openpyxl",
+        "fastapi": "fastapi",
+        "uvicorn": "uvicorn",
+        "requests": "requests"
+    }
     
     missing = []
-    for package in required_packages:
+    for package, module in required_packages.items():
         try:
-            if package == "PyInstaller":
-                result = subprocess.run([sys.executable, "-m", "PyInstaller", "--version"], 
-                                      capture_output=True, text=True)
-                if result.returncode != 0:
-                    missing.append(package)
-            elif package == "scikit-image":
-                __import__("skimage")
-            else:
-                __import__(package.replace("-", "_").lower())
-        except (ImportError, Exception):
+            if importlib.util.find_spec(module) is None:
+                missing.append(package)
+        except (ImportError, ValueError):
             missing.append(package)
     
     if missing:
@@ -59,24 +59,98 @@ def check_dependencies():
     print("✅ All required packages are installed!")
     return True
 
+BUILD_CACHE = Path(".build_cache.json")
+
+def environment_key():
+    """Key for cached check results: the interpreter, the OS and requirements.txt"""
+    req = Path("requirements.txt")
+    req_mtime = req.stat().st_mtime_ns if req.exists() else 0
+    return f"{sys.version}|{platform.platform()}|{req_mtime}"
+
+def run_checks():
+    """Run the platform and dependency checks concurrently, reusing the last passing result"""
+    key = environment_key()
+    try:
+        if json.loads(BUILD_CACHE.read_text()).get("key") == key:
+            print("✅ Platform and dependencies already verified for this environment")
+            return True
+    except (OSError, ValueError):
+        pass
+    
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(lambda check: check(), [check_platform, check_dependencies]))
+    
+    # Only a passing run is cached, so a fix made after a failure is picked up next time
+    if all(results):
+        try:
+            BUILD_CACHE.write_text(json.dumps({"key": key}))
+        except OSError:
+            pass
+    return all(results)
+
 def clean_build():
     """Clean previous build files"""
     build_dirs = ["build", "dist", "__pycache__"]
-    for build_dir in build_dirs:
-        if os.path.exists(build_dir):
-            print(f"🧹 Cleaning {build_dir}...")
-            shutil.rmtree(build_dir)
+    print(f"🧹 Cleaning {', '.join(build_dirs)}...")
+    # The trees are independent, so remove them concurrently; missing ones are ignored
+    with ThreadPoolExecutor(max_workers=len(build_dirs)) as executor:
+        list(executor.map(lambda d: shutil.rmtree(d, ignore_errors=True), build_dirs))
+
+def build_kernels():
+    """Ahead-of-time compile the torso numeric kernels (optional, needs numba)"""
+    print("⚙️  Compiling torso kernels...")
+    try:
+        subprocess.run([sys.executable, "_torso_kernels_build.py"],
+                       check=True, capture_output=True, text=True)
+        print("✅ torso_kernels compiled")
+    except (subprocess.CalledProcessError, OSError):
+        print("⚠️  Could not compile torso_kernels; the app will JIT-compile them at runtime instead")
+
+# Inputs whose contents decide whether PyInstaller's analysis can be reused
+BUILD_INPUTS = [
+    "main.py", "script.py", "nema_body.py", "torso.py", "head_neck.py",
+    "desktop_backend.py", "desktop_gui.py", "requirements.txt"
+]
+PYI_CACHE_DIR = Path(".pyi_cache")
+SPEC_FILE = Path("MRI_DICOM_Analysis.spec")
+
+def spec_is_fresh():
+    """True when the spec PyInstaller generated last time is newer than every build input"""
+    if not SPEC_FILE.exists():
+        return False
+    spec_mtime = SPEC_FILE.stat().st_mtime
+    # This script defines the PyInstaller options, so editing it also invalidates the spec
+    inputs = [Path(name) for name in BUILD_INPUTS] + [Path(__file__)]
+    return all(not path.exists() or path.stat().st_mtime < spec_mtime for path in inputs)
+
+def build_workpath():
+    """Return a PyInstaller work directory keyed on the build inputs, dropping stale ones"""
+    sig = hashlib.sha256()
+    for name in BUILD_INPUTS:
+        path = Path(name)
+        sig.update(name.encode())
+        if path.exists():
+            sig.update(path.read_bytes())
+    workpath = PYI_CACHE_DIR / sig.hexdigest()[:12]
+    if PYI_CACHE_DIR.exists():
+        for old in PYI_CACHE_DIR.iterdir():
+            if old != workpath:
+                shutil.rmtree(old, ignore_errors=True)
+    if workpath.exists():
+        print(f"♻️  Reusing PyInstaller cache {workpath}")
+    return workpath
 
 def build_windows_exe():
     """Build Windows executable using PyInstaller"""
     print("🔨 Building Windows executable...")
+    workpath = build_workpath()
     
     # Windows-specific PyInstaller arguments
     args = [
         sys.executable, "-m", "PyInstaller",
         "main.py",
         "--name=MRI_DICOM_Analysis",
-        "--onefile",
+        "--onedir",
         "--windowed",
         "--console",  # Show console for debugging
         
@@ -108,13 +182,26 @@ def build_windows_exe():
         "--hidden-import=openpyxl",
         "--hidden-import=fastapi",
         "--hidden-import=uvicorn",
+        "--hidden-import=torso_kernels",
         
-        # Windows-specific options
-        "--clean",
+        # Windows-specific options; no --clean, the work path is reused while inputs are unchanged
+        f"--workpath={workpath}",
+        "--distpath=dist",
         "--noconfirm",
         "--icon=NONE"  # Avoid icon issues
     ]
     
+    if spec_is_fresh():
+        # Build from the spec written by the last run; options baked into it can't be repeated here
+        print(f"♻️  Reusing {SPEC_FILE}")
+        args = [
+            sys.executable, "-m", "PyInstaller",
+            str(SPEC_FILE),
+            f"--workpath={workpath}",
+            "--distpath=dist",
+            "--noconfirm"
+        ]
+    
     print("🔧 Running PyInstaller...")
     print(f"   Command: {' '.join(args[2:])}")  # Skip python and -m PyInstaller
     
@@ -122,18 +209,19 @@ def build_windows_exe():
         result = subprocess.run(args, check=True, capture_output=True, text=True)
         
         # Check if executable was created
-        exe_path = Path("dist") / "MRI_DICOM_Analysis.exe"
+        app_dir = Path("dist") / "MRI_DICOM_Analysis"
+        exe_path = app_dir / "MRI_DICOM_Analysis.exe"
         
         if exe_path.exists():
-            file_size = exe_path.stat().st_size / (1024 * 1024)  # Size in MB
-            print(f"\n🎉 SUCCESS! Windows executable created!")
+            folder_size = sum(f.stat().st_size for f in app_dir.rglob("*") if f.is_file()) / (1024 * 1024)  # Size in MB
+            print(f"\n🎉 SUCCESS! Windows application created!")
             print(f"📍 Location: {exe_path.absolute()}")
-            print(f"📏 Size: {file_size:.1f} MB")
+            print(f"📏 Size: {folder_size:.1f} MB (whole folder)")
             print(f"🖥️  Platform: Windows {platform.machine()}")
             
             print(f"\n📦 How to distribute:")
-            print(f"1. Copy 'MRI_DICOM_Analysis.exe' to any Windows computer")
-            print(f"2. Double-click the .exe file to run")
+            print(f"1. Copy (or zip) the whole 'MRI_DICOM_Analysis' folder to any Windows computer")
+            print(f"2. Double-click MRI_DICOM_Analysis.exe inside it to run")
             print(f"3. No Python installation needed on target computer!")
             
             print(f"\n⚠️  First-time users may see:")
@@ -162,22 +250,21 @@ def main():
     print("🚀 MRI DICOM Analysis - Windows Build Script")
     print("=" * 50)
     
-    # Check if we're on Windows
-    if not check_platform():
-        sys.exit(1)
-    
     # Change to script directory
     script_dir = Path(__file__).parent
     os.chdir(script_dir)
     print(f"📁 Working directory: {script_dir.absolute()}")
     
-    # Check dependencies
-    if not check_dependencies():
+    # Check we're on Windows with every dependency installed
+    if not run_checks():
         sys.exit(1)
     
     # Clean previous builds
     clean_build()
     
+    # Compile optional native kernels
+    build_kernels()
+    
     # Build executable
     success = build_windows_exe()
     
@@ -7,8 +7,12 @@ Main entry point for the desktop app
 import sys
 import os
 import logging
+import multiprocessing
 from pathlib import Path
 
+# Worker processes started by the analysis modules re-enter this script in the frozen app
+multiprocessing.freeze_support()
+
 # Ensure proper working directory
 if hasattr(sys, '_MEIPASS'):
     # Running as PyInstaller bundle
@@ -17,36 +21,36 @@ else:
     # Running as script
     os.chdir(Path(__file__).parent)
 
-try:
-    # Import our modules
+def main():
+    """Main function to start the application."""
+    # Imported here rather than at module level: spawned analysis workers re-import this
+    # script as __mp_main__ and must not load the GUI or create another backend
     from desktop_backend import backend
     from desktop_gui import MRIAnalysisApp
     import flet as ft
     
-    def main():
-        """Main function to start the application."""
-        # Configure logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('app.log'),
-                logging.StreamHandler()
-            ]
-        )
-        
-        # Create and run the Flet application
-        app = MRIAnalysisApp(backend)
-        ft.run(app.main, view=ft.AppView.FLET_APP)
+    # Configure logging
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('app.log'),
+            logging.StreamHandler()
+        ]
+    )
+    
+    # Create and run the Flet application
+    app = MRIAnalysisApp(backend)
+    ft.run(app.main, view=ft.AppView.FLET_APP)
 
-    if __name__ == "__main__":
+if __name__ == "__main__":
+    try:
         main()
-
-except ImportError as e:
-    print(f"Error importing modules: {e}")
-    print("Please ensure all dependencies are installed:")
-    print("pip install -r requirements.txt")
-    sys.exit(1)
-except Exception as e:
-    print(f"Error starting application: {e}")
-    sys.exit(1) 
\ No newline at end of file
+    except ImportError as e:
+        print(f"Error importing modules: {e}")
+        print("Please ensure all dependencies are installed:")
+        print("pip install -r requirements.txt")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error starting application: {e}")
+        sys.exit(1)
@@ -11,6 +11,17 @@ import pydicom
 # matplotlib imports removed for desktop app
 from skimage import measure, filters, morphology
 
+try:
+    import torso_kernels  # ahead-of-time build from _torso_kernels_build.py
+except ImportError:
+    torso_kernels = None
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; fall back to NumPy broadcasting
+    njit = None
+    prange = range
+
 # Configure logging
 today_str = datetime.datetime.now().strftime("%Y_%m_%d")
 log_dir = os.path.join(os.getcwd(), 'outputs')
@@ -60,8 +71,8 @@ def normalize_label(label: str) -> str:
     return re.sub(r'[^a-z]', '', label.lower())
 
 def compute_metrics(image: np.ndarray, mask: np.ndarray):
-    data = image[mask == 1]
-    return float(np.max(data)), float(np.min(data)), float(np.mean(data))
+    sig_max, sig_min, sig_mean, _ = roi_stats(image, mask)
+    return sig_max, sig_min, sig_mean
 
 def compute_snr(signal_mean: float, noise_std: float, is_individual: bool = False) -> float:
     multiplier = 0.66 if is_individual else 0.7
@@ -73,6 +84,89 @@ def compute_uniformity(signal_max: float, signal_min: float) -> float:
         return 0.0
     return round(100.0 * (1 - ((signal_max - signal_min) / denom)), 1)
 
+# Numeric kernels. Plain loops so the same source can be JIT-compiled here
+# or exported ahead of time by _torso_kernels_build.py.
+def _circle_mask_kernel(height, width, center_y, center_x, r2):
+    out = np.empty((height, width), np.bool_)
+    for y in prange(height):
+        dy = y - center_y
+        dy2 = dy * dy
+        for x in range(width):
+            dx = x - center_x
+            out[y, x] = (dx * dx + dy2) <= r2
+    return out
+
+def _roi_stats_kernel(image, mask):
+    # Returns [max, min, mean, std] of the pixels under mask (two-pass std, like np.std)
+    out = np.full(4, np.nan)
+    n = 0
+    total = 0.0
+    vmax = -np.inf
+    vmin = np.inf
+    for y in range(image.shape[0]):
+        for x in range(image.shape[1]):
+            if mask[y, x]:
+                v = image[y, x]
+                n += 1
+                total += v
+                if v > vmax:
+                    vmax = v
+                if v < vmin:
+                    vmin = v
+    if n == 0:
+        return out
+    mean = total / n
+    sq = 0.0
+    for y in range(image.shape[0]):
+        for x in range(image.shape[1]):
+            if mask[y, x]:
+                d = image[y, x] - mean
+                sq += d * d
+    out[0] = vmax
+    out[1] = vmin
+    out[2] = mean
+    out[3] = np.sqrt(sq / n)
+    return out
+
+if njit is not None:
+    _circle_mask_numba = njit(parallel=True, fastmath=True, cache=True)(_circle_mask_kernel)
+    _roi_stats_numba = njit(cache=True)(_roi_stats_kernel)
+
+def _circle_mask_numpy(height, width, center_y, center_x, r2):
+    Y, X = np.ogrid[:height, :width]
+    return ((X - center_x) ** 2 + (Y - center_y) ** 2) <= r2
+
+def circle_mask(height: int, width: int, center_y, center_x, radius) -> np.ndarray:
+    # Single fused pass when compiled kernels are available, no (H, W) temporaries
+    args = (int(height), int(width), int(center_y), int(center_x), float(radius) ** 2)
+    if torso_kernels is not None:
+        return torso_kernels.circle_mask(*args)
+    if njit is not None:
+        return _circle_mask_numba(*args)
+    return _circle_mask_numpy(*args)
+
+def roi_stats(image: np.ndarray, mask: np.ndarray) -> tuple:
+    """Return (max, min, mean, std) of the image pixels under mask."""
+    mask = mask.view(bool)
+    if torso_kernels is not None:
+        out = torso_kernels.roi_stats(np.asarray(image, dtype=np.float64), mask)
+    elif njit is not None:
+        out = _roi_stats_numba(image, mask)
+    else:
+        data = image[mask]
+        return float(np.max(data)), float(np.min(data)), float(np.mean(data)), float(np.std(data))
+    return float(out[0]), float(out[1]), float(out[2]), float(out[3])
+
+def find_peak_intensity(image: np.ndarray, stride: int = 4) -> tuple:
+    # Coarse argmax on a strided view, then refine in the neighbourhood of the hit
+    small = image[::stride, ::stride]
+    cy, cx = np.unravel_index(np.argmax(small), small.shape)
+    y0 = max(cy * stride - stride, 0)
+    x0 = max(cx * stride - stride, 0)
+    window = image[y0:cy * stride + 2 * stride, x0:cx * stride + 2 * stride]
+    dy, dx = np.unravel_index(np.argmax(window), window.shape)
+    return int(y0 + dy), int(x0 + dx)
+
 def detect_circular_object(image):
     threshold = filters.threshold_otsu(image)
     binary_mask = image > threshold
@@ -99,8 +193,7 @@ def create_circular_roi_nema_style(image, pixel_spacing, desired_area_mm2=338*10
         logging.warning("Computed ROI radius is too small, defaulting to 1 pixel.")
         radius_pixels = 1
     # Visualization removed for desktop app
-    Y, X = np.ogrid[:height, :width]
-    mask = ((X - center_x) ** 2 + (Y - center_y) ** 2) <= radius_pixels ** 2
+    mask = circle_mask(height, width, center_y, center_x, radius_pixels)
     return mask.astype(np.uint8)
 
 def create_central_circle_roi(image, pixel_spacing, desired_area_mm2=NOISE_AREA_MM2, show_plot=False):
@@ -110,8 +203,7 @@ def create_central_circle_roi(image, pixel_spacing, desired_area_mm2=NOISE_AREA_
     avg_spacing = (pixel_spacing[0] + pixel_spacing[1]) / 2
     r_pixels = r_mm / avg_spacing
     # Visualization removed for desktop app
-    Y, X = np.ogrid[:height, :width]
-    mask = ((X - center_x) ** 2 + (Y - center_y) ** 2) <= r_pixels ** 2
+    mask = circle_mask(height, width, center_y, center_x, r_pixels)
     return mask.astype(np.uint8)
 
 def create_roi_mask(
@@ -136,11 +228,9 @@ def create_roi_mask(
     center_y, center_x = height // 2, width // 2
 
     if mode == 'signal' and find_max_intensity:
-        phantom_mask = image > 0
-        if np.any(phantom_mask):
-            masked_image = np.where(phantom_mask, image, 0)
-            max_idx = np.unravel_index(np.argmax(masked_image), masked_image.shape)
-            center_y, center_x = max_idx
+        peak_y, peak_x = find_peak_intensity(image)
+        if image[peak_y, peak_x] > 0:
+            center_y, center_x = peak_y, peak_x
         else:
             logging.warning("Signal fallback: no phantom detected.")
 
@@ -148,19 +238,12 @@ def create_roi_mask(
     center_x = max(margin, min(width - margin, center_x))
     center_y = max(margin, min(height - margin, center_y))
 
-    Y, X = np.ogrid[:height, :width]
-    mask = ((X - center_x) ** 2 + (Y - center_y) ** 2) <= r_pixels ** 2
+    mask = circle_mask(height, width, center_y, center_x, r_pixels)
 
     if mode == 'signal':
         logging.debug(f"Signal ROI at ({center_x}, {center_y}), radius: {r_pixels:.1f} pixels")
-        data = image[mask]
-        if data.size > 0:
-            logging.debug(f"Signal ROI values - min: {np.min(data):.1f}, max: {np.max(data):.1f}, mean: {np.mean(data):.1f}")
     else:
         logging.debug(f"Noise ROI at center ({center_x}, {center_y}), radius: {r_pixels:.1f} pixels")
-        data = image[mask]
-        if data.size > 0:
-            logging.debug(f"Noise ROI stats - mean: {np.mean(data):.1f}, std: {np.std(data):.1f}, min: {np.min(data):.1f}, max: {np.max(data):.1f}")
 
     return mask.astype(np.uint8), center_x, center_y, r_pixels
 
@@ -256,8 +339,8 @@ def process_torso_folder(folder: str) -> tuple:
         # SNR calculation using Norm-off (signal) and noise
         sig_mask = create_circular_roi_nema_style(signal_image, signal_spacing, show_plot=False)
         noise_mask = create_central_circle_roi(noise_image, noise_spacing, show_plot=False)
-        sig_mean = float(np.mean(signal_image[sig_mask == 1]))  # only for SNR
-        noise_std = float(np.std(noise_image[noise_mask == 1]))
+        _, _, sig_mean, _ = roi_stats(signal_image, sig_mask)  # only for SNR
+        _, _, _, noise_std = roi_stats(noise_image, noise_mask)
         snr = compute_snr(sig_mean, noise_std)
 
         # Uniformity and signal stats using Norm-on image
@@ -311,8 +394,11 @@ def process_torso_folder(folder: str) -> tuple:
 
         # Visualization removed for desktop app
 
-        _, _, sig_mean = compute_metrics(signal_image, sig_mask)
-        noise_std = float(np.std(noise_image[noise_mask == 1]))
+        # One pass per ROI yields every statistic
+        sig_max, sig_min, sig_mean, _ = roi_stats(signal_image, sig_mask)
+        logging.debug(f"Signal ROI values - min: {sig_min:.1f}, max: {sig_max:.1f}, mean: {sig_mean:.1f}")
+        _, _, noise_mean, noise_std = roi_stats(noise_image, noise_mask)
+        logging.debug(f"Noise ROI stats - mean: {noise_mean:.1f}, std: {noise_std:.1f}")
         snr = compute_snr(sig_mean, noise_std, is_individual=True)
 
         element_results.append({